@@ -1,4 +1,5 @@
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import (
    QApplication, 
    QDialog,
@@ -21,6 +22,8 @@ from PyQt5 import uic
 from template_config import TemplateConfiguration
 from schedule_dialog import ScheduleDialog
 from view_schedule_dialog import ViewScheduleDialog
+from connection_pool import ConnectionPool
+from logging_handlers import BackgroundFileWriter
 
 widget, base = uic.loadUiType('auto_scheduler.ui')
 
@@ -85,7 +88,16 @@ class AutoScheduler(widget, base):
         pass
 
 
-app = QApplication(sys.argv)
-auto_scheduler = AutoScheduler()
-auto_scheduler.show()
-sys.exit(app.exec_())   
\ No newline at end of file
+if __name__ == "__main__":
+    # Schedule generation can run in worker processes; on Windows these re-import
+    # the main module, so the application must only start in the parent process.
+    multiprocessing.freeze_support()
+
+    app = QApplication(sys.argv)
+    auto_scheduler = AutoScheduler()
+    auto_scheduler.show()
+    ret = app.exec_()
+
+    ConnectionPool.close_all_pools()
+    BackgroundFileWriter.close_all()
+    sys.exit(ret)
@@ -0,0 +1,187 @@
+"""
+Times the schedule pipeline on synthetic data: building the track catalog,
+generating the schedule with ScheduleEngine, building the save rows of
+ScheduleUpdater and the per date and hour grouping of the summary dialog.
+No database is needed. Results are printed as JSON, or written to --output,
+so runs of different releases can be compared. Run it from the repository
+root, the dialogs load their .ui files from the working directory:
+
+    python -m benchmarks.schedule_pipeline --days 7 --hours 6-22 --output before.json
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import time
+
+from PyQt5.QtCore import (
+    QDate,
+    PYQT_VERSION_STR
+)
+
+from logging_handlers import EventLogger
+from track_catalog import TrackCatalog
+from schedule_engine import ScheduleEngine
+from schedule_updater import ScheduleUpdater
+from schedule_summary import ScheduleSummaryDialog
+
+from benchmarks import synthetic
+
+
+class _QuietHandler:
+    # The benchmark times the code, not the console
+    def log(self, msg: str):
+        pass
+
+
+def parse_hours(text: str) -> list:
+    # "6-22" or "6,7,8"
+    if "-" in text:
+        first, last = text.split("-")
+        return list(range(int(first), int(last) + 1))
+    return [int(hour) for hour in text.split(",")]
+
+
+def timed(func, repeat: int) -> tuple:
+    # Returns (result of the last run, [seconds of each run])
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, times
+
+
+def summarize(times: list, count: int, unit: str) -> dict:
+    best = min(times)
+    return {
+        "runs": len(times),
+        "best_s": round(best, 6),
+        "median_s": round(statistics.median(times), 6),
+        "count": count,
+        "unit": unit,
+        "best_us_per_unit": round(best * 1e6 / count, 3) if count > 0 else None
+    }
+
+
+def bench_catalog(args) -> tuple:
+    rows = synthetic.make_track_rows(args.folders, args.tracks_per_folder, args.durations, args.genres, args.seed)
+    catalog, times = timed(lambda: TrackCatalog.from_rows(rows), args.repeat)
+    return catalog, summarize(times, len(rows), "track")
+
+
+def bench_generate(args, catalog, template, dates: list, hours: list) -> tuple:
+    folders = synthetic.make_folders(catalog)
+    logger = EventLogger(handler=_QuietHandler)
+
+    times = []
+    daily_schedule = {}
+    engine = None
+
+    for run in range(args.repeat):
+        # Breaks are rebuilt for each run, generation sets their start times
+        comm_breaks = synthetic.make_comm_breaks(dates, hours, args.breaks_per_hour, seed=args.seed)
+        engine = ScheduleEngine(template, catalog, folders, logger, rng=random.Random(args.seed + run),
+                                max_attempts=args.max_attempts)
+
+        start = time.perf_counter()
+        daily_schedule = {}
+        for sched_date in dates:
+            date_str = sched_date.toString("yyyy-MM-dd")
+            day_breaks = {hr: comm_breaks.get((date_str, hr), []) for hr in hours}
+            daily_schedule[date_str] = engine.generate_day(sched_date, hours, day_breaks)
+        times.append(time.perf_counter() - start)
+
+    stats = engine.stats()
+    result = summarize(times, len(dates) * len(hours), "hour")
+    result["items"] = sum(len(items) for items in daily_schedule.values())
+    result["attempts"] = stats.total_attempts()
+    result["retried_hours"] = len(stats.retried_hours())
+    result["trimmed_hours"] = len(stats.trimmed_hours())
+    return daily_schedule, result
+
+
+def bench_save_rows(args, daily_schedule: dict) -> dict:
+    # The rows are built without a ScheduleUpdater, it would open a connection
+    def build():
+        rows = 0
+        for date_str, items in daily_schedule.items():
+            schedule_rows, auto_rows = ScheduleUpdater._make_date_rows(QDate.fromString(date_str, "yyyy-MM-dd"), 1, items)
+            rows += len(schedule_rows) + len(auto_rows)
+        return rows
+
+    rows, times = timed(build, args.repeat)
+    return summarize(times, rows, "row")
+
+
+def bench_summary(args, daily_schedule: dict, dates: list) -> dict:
+    # Items as read back from AutoSchedule carry their schedule date
+    items = []
+    for date_str, date_items in daily_schedule.items():
+        sched_date = QDate.fromString(date_str, "yyyy-MM-dd")
+        for item in date_items.values():
+            item.set_schedule_date(sched_date)
+            items.append(item)
+
+    # The grouping methods do not use the dialog, so no widget is created
+    def group():
+        ScheduleSummaryDialog.group_schedule_items_by_date(None, items, dates)
+        return ScheduleSummaryDialog.group_schedule_by_datetime(None, items, dates)
+
+    grouped, times = timed(group, args.repeat)
+    return summarize(times, len(items), "item")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schedule pipeline benchmark")
+    parser.add_argument("--folders", type=int, default=50)
+    parser.add_argument("--tracks-per-folder", type=int, default=2000)
+    parser.add_argument("--durations", choices=sorted(synthetic.DURATIONS), default="normal")
+    parser.add_argument("--genres", type=int, default=20)
+    parser.add_argument("--hours", type=parse_hours, default=parse_hours("6-22"))
+    parser.add_argument("--slots-per-hour", type=int, default=15)
+    parser.add_argument("--slot-mix", choices=sorted(synthetic.SLOT_MIXES), default="mixed")
+    parser.add_argument("--breaks-per-hour", type=int, default=3)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--max-attempts", type=int, default=ScheduleEngine.MAX_HOUR_ATTEMPTS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="JSON file to write, printed when not given")
+    args = parser.parse_args()
+
+    catalog, catalog_result = bench_catalog(args)
+
+    template = synthetic.make_template(catalog, args.hours, args.slots_per_hour, args.slot_mix, seed=args.seed)
+    dates = synthetic.make_dates(QDate(2025, 1, 6), args.days)
+
+    daily_schedule, generate_result = bench_generate(args, catalog, template, dates, args.hours)
+
+    report = {
+        "benchmark": "schedule_pipeline",
+        "environment": {
+            "python": platform.python_version(),
+            "pyqt": PYQT_VERSION_STR,
+            "platform": platform.platform()
+        },
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": {
+            "catalog_build": catalog_result,
+            "generate": generate_result,
+            "save_rows": bench_save_rows(args, daily_schedule),
+            "summary_grouping": bench_summary(args, daily_schedule, dates)
+        }
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+            f.write("\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Fills a SQLite stand-in database (see db_backend.SQLiteBackend) with
+synthetic tracks, the media tree, a template and the commercial breaks
+booked for a date range, so generation, saves and validations can be run
+locally at production volumes. Run it from the repository root. Point the
+application at it with:
+
+    set AUTO_SCHEDULER_BACKEND=sqlite
+    set AUTO_SCHEDULER_SQLITE_DB=data/studioone.db
+
+    python -m benchmarks.seed_sqlite --database data/studioone.db --folders 50 --tracks-per-folder 2000
+"""
+import argparse
+import datetime
+import random
+
+from PyQt5.QtCore import QDate
+
+from db_backend import (
+    SQLiteBackend,
+    set_backend
+)
+from data_types import DBAction
+from mssql_data import MSSQLData
+
+from benchmarks import synthetic
+from benchmarks.schedule_pipeline import parse_hours
+
+
+def seed_tracks(cursor, args) -> int:
+    rows = synthetic.make_track_rows(args.folders, args.tracks_per_folder, args.durations, args.genres, args.seed)
+    cursor.execute("DELETE FROM Tracks")
+    cursor.executemany("INSERT INTO Tracks (TrackReference, TrackTitle, ArtistSearch, Duration, ArtistID_1, "
+                       " FolderID, FilePath, Genre, TrackPrimeNote) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return len(rows)
+
+
+def seed_tree(cursor, args) -> int:
+    # One root with the folders under it, folder ids are the node ids
+    nodes = [(0, "Media", -1)]
+    nodes += [(folder_id, f"Folder {folder_id}", 0) for folder_id in range(1, args.folders + 1)]
+    cursor.execute("DELETE FROM tree")
+    cursor.executemany("INSERT INTO tree (NodeID, NodeName, NodeParent) VALUES (?, ?, ?)", nodes)
+    return len(nodes)
+
+
+def seed_comm_breaks(cursor, dates: list, args) -> int:
+    # Schedule rows with ItemSource COMMS, each with its booked spots
+    rng = random.Random(args.seed)
+    comm_breaks = synthetic.make_comm_breaks(dates, args.hours, args.breaks_per_hour, seed=args.seed)
+
+    cursor.execute("DELETE FROM SpotBookings")
+    cursor.execute("DELETE FROM Spots")
+    cursor.execute("DELETE FROM Schedule WHERE ItemSource = 'COMMS'")
+
+    count = 0
+    for (date_str, hour), breaks in comm_breaks.items():
+        sched_date = datetime.date.fromisoformat(date_str)
+        for comm_break in breaks:
+            cursor.execute("INSERT INTO Schedule (ScheduleService, ScheduleDate, ScheduleTime, ScheduleHour, "
+                           " PlayStatus, ItemSource, ScheduleCommMediaType, BookedSpots) "
+                           " VALUES (1, ?, ?, ?, '', 'COMMS', 'AUDIO', ?) RETURNING ScheduleReference",
+                           (sched_date, comm_break.start_time().toString("HH:mm:ss"), hour,
+                            comm_break.booked_spots()))
+            break_ref = cursor.fetchval()
+
+            for _ in range(comm_break.booked_spots()):
+                cursor.execute("INSERT INTO Spots (SpotBookedDuration) VALUES (?) RETURNING SpotRef",
+                               (rng.choice([15, 30, 30, 45, 60]),))
+                spot_ref = cursor.fetchval()
+                cursor.execute("INSERT INTO SpotBookings (SpotBookingBreakRef, SpotBookingSpot, "
+                               " SpotBookingPlayStatus) VALUES (?, ?, '')", (break_ref, spot_ref))
+            count += 1
+
+    return count
+
+
+def seed_template(backend: SQLiteBackend, catalog, args) -> int:
+    template = synthetic.make_template(catalog, args.hours, args.slots_per_hour, args.slot_mix, seed=args.seed)
+    template.set_db_action(DBAction.CREATE)
+    for item in template.items().values():
+        item.set_db_action(DBAction.CREATE)
+
+    db = MSSQLData("", backend.database(), "", "", backend=backend)
+    db.save({template.name(): template})
+    return template.id()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a SQLite stand-in database with synthetic data")
+    parser.add_argument("--database", default="data/studioone.db")
+    parser.add_argument("--folders", type=int, default=50)
+    parser.add_argument("--tracks-per-folder", type=int, default=2000)
+    parser.add_argument("--durations", choices=sorted(synthetic.DURATIONS), default="normal")
+    parser.add_argument("--genres", type=int, default=20)
+    parser.add_argument("--hours", type=parse_hours, default=parse_hours("6-22"))
+    parser.add_argument("--slots-per-hour", type=int, default=15)
+    parser.add_argument("--slot-mix", choices=sorted(synthetic.SLOT_MIXES), default="mixed")
+    parser.add_argument("--breaks-per-hour", type=int, default=3)
+    parser.add_argument("--start-date", default=QDate.currentDate().toString("yyyy-MM-dd"))
+    parser.add_argument("--days", type=int, default=28)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    backend = SQLiteBackend(args.database)
+    set_backend(backend)
+
+    dates = synthetic.make_dates(QDate.fromString(args.start_date, "yyyy-MM-dd"), args.days)
+
+    con = backend.connect(args.database)
+    cursor = con.cursor()
+    tracks = seed_tracks(cursor, args)
+    nodes = seed_tree(cursor, args)
+    breaks = seed_comm_breaks(cursor, dates, args)
+    con.commit()
+    con.close()
+
+    catalog = synthetic.make_catalog(args.folders, args.tracks_per_folder, args.durations, args.genres, args.seed)
+    template_id = seed_template(backend, catalog, args)
+
+    print(f"{args.database}: {tracks} tracks, {nodes} tree nodes, {breaks} commercial breaks, "
+          f"template id {template_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Synthetic track catalogs, templates and commercial breaks for the
+benchmarks. Everything is built from a seed, so a run can be repeated
+without a StudioONE database.
+"""
+import random
+
+from PyQt5.QtCore import (
+    QDate,
+    QTime
+)
+
+from template import Template
+from template_item import (
+    HeaderItem,
+    FolderItem,
+    SongItem,
+    CommercialBreakItem
+)
+
+from track_catalog import TrackCatalog
+
+# Track durations in ms, (name -> function of rng). Real libraries are
+# mostly 3 to 4 minute songs with a tail of long mixes and short jingles.
+DURATIONS = {
+    "uniform": lambda rng: rng.randint(20000, 420000),
+    "normal": lambda rng: max(10000, int(rng.gauss(215000, 45000))),
+    "lognormal": lambda rng: min(1800000, max(5000, int(rng.lognormvariate(12.2, 0.35))))
+}
+
+# Share of each template slot type, (folder, fixed song, rotated song)
+SLOT_MIXES = {
+    "folders": (1.0, 0.0, 0.0),
+    "mixed": (0.7, 0.15, 0.15),
+    "rotation": (0.4, 0.0, 0.6)
+}
+
+
+def make_track_rows(folder_count: int, tracks_per_folder: int, durations: str = "normal",
+                    genre_count: int = 20, seed: int = 1) -> list:
+    # Rows in TrackColumns order, for TrackCatalog.from_rows
+    rng = random.Random(seed)
+    duration = DURATIONS[durations]
+    artist_count = max(1, folder_count * tracks_per_folder // 10)
+    shows = ["", "", "", "", "1", "2,5", "3,4,7"]
+
+    rows = []
+    track_id = 0
+    for folder_id in range(1, folder_count + 1):
+        for _ in range(tracks_per_folder):
+            track_id += 1
+            artist_id = rng.randint(1, artist_count)
+            rows.append((track_id, f"Track title {track_id}", f"Artist {artist_id}", duration(rng),
+                         artist_id, folder_id, f"\\\\media\\audio\\{folder_id}\\",
+                         rng.randint(1, genre_count), rng.choice(shows)))
+    return rows
+
+
+def make_catalog(folder_count: int, tracks_per_folder: int, durations: str = "normal",
+                 genre_count: int = 20, seed: int = 1) -> TrackCatalog:
+    return TrackCatalog.from_rows(make_track_rows(folder_count, tracks_per_folder, durations, genre_count, seed))
+
+
+def make_folders(catalog: TrackCatalog) -> dict:
+    # {folder_id: folder name} as read from the media tree
+    return {folder_id: f"Folder {folder_id}" for folder_id in catalog}
+
+
+def make_template(catalog: TrackCatalog, hours: list, slots_per_hour: int = 15, slot_mix: str = "mixed",
+                  template_id: int = 1, seed: int = 1) -> Template:
+    rng = random.Random(seed)
+    folder_share, song_share, rotation_share = SLOT_MIXES[slot_mix]
+    folder_ids = list(catalog.keys())
+
+    template = Template(f"Synthetic {slot_mix}")
+    template.set_id(template_id)
+    template.set_hours(hours)
+    template.set_dow([1, 2, 3, 4, 5, 6, 7])
+    template.set_filler_folder(folder_ids[0])
+
+    slot_duration = 3600000 // (slots_per_hour + 1)
+
+    for hour in hours:
+        header = HeaderItem()
+        header.set_hour(hour)
+        header.set_start_time(QTime(hour, 0, 0))
+        header.set_item_row(0)
+        template.add_item(header)
+
+        for slot in range(slots_per_hour):
+            folder_id = rng.choice(folder_ids)
+            kind = rng.random()
+
+            if kind < folder_share:
+                item = FolderItem(f"Folder {folder_id}")
+                item.set_duration(slot_duration)
+            else:
+                track = catalog.view(rng.randrange(*catalog.folder_range(folder_id)))
+                item = SongItem(track.title())
+                item.set_title(track.title())
+                item.set_duration(track.duration())
+                item.set_track_id(track.track_id())
+                item.set_artist_id(track.artist_id())
+                item.set_artist_name(track.artist_name())
+                item.set_item_path(track.file_path())
+                item.set_genre(track.genre())
+                item.set_rotation("R" if kind >= folder_share + song_share else "N")
+
+            item.set_folder_id(folder_id)
+            item.set_folder_name(f"Folder {folder_id}")
+            item.set_hour(hour)
+            item.set_item_row(slot + 1)
+            item.set_start_time(QTime(hour, 0, 0).addMSecs(slot * slot_duration))
+            template.add_item(item)
+
+    return template
+
+
+def make_dates(start_date: QDate, days: int) -> list:
+    return [start_date.addDays(day) for day in range(days)]
+
+
+def make_comm_breaks(dates: list, hours: list, breaks_per_hour: int = 3, max_spots: int = 6,
+                     seed: int = 1) -> dict:
+    # {(yyyy-MM-dd, hour): [CommercialBreakItem]}, as MSSQLData.fetch_comm_breaks
+    rng = random.Random(seed)
+    comm_breaks = {}
+
+    for sched_date in dates:
+        date_str = sched_date.toString("yyyy-MM-dd")
+        for hour in hours:
+            breaks = []
+            for index in range(breaks_per_hour):
+                minute = (index + 1) * 60 // (breaks_per_hour + 1)
+                spots = rng.randint(1, max_spots)
+
+                comm_break = CommercialBreakItem(f"{hour:02d}:{minute:02d}:00 - Commercial Break ({spots} spots)")
+                comm_break.set_hour(hour)
+                comm_break.set_start_time(QTime(hour, minute, 0))
+                comm_break.set_booked_spots(spots)
+                comm_break.set_booked_duration(spots * 30000)
+                breaks.append(comm_break)
+            comm_breaks[(date_str, hour)] = breaks
+
+    return comm_breaks
@@ -0,0 +1,115 @@
+"""
+Construction cost and memory of schedule items, before and after slotted
+TemplateItem. The `before` item is a copy of the previous constructor:
+a __dict__ with every attribute set up front, a QTime, a QDate and a
+SHA-256 identifier.
+
+    python -m benchmarks.template_item_alloc --items 100000
+"""
+import argparse
+import gc
+import hashlib
+import os
+import random
+import string
+import time
+import tracemalloc
+
+from PyQt5.QtCore import (
+    QTime,
+    QDate
+)
+
+from data_types import (
+    DBAction,
+    ItemType
+)
+from template_item import SongItem
+
+
+class LegacySongItem:
+    def __init__(self, item_title: str=""):
+        self._id = -1
+        self._item_type = ItemType.EMPTY
+        self._start_time = QTime()
+        self._formatted_time = ""
+        self._hour = -1
+        self._duration = 0
+        self._title = ""
+        self._artist_id = -1
+        self._artist_name = ""
+        self._folder_name = ""
+        self._folder_id = -1
+        self._item_path=""
+        self._track_id = 0
+        self._item_row = -1
+        self._item_title = item_title
+        self._time_stamp = self.generate_time_stamp()
+        self._db_action = DBAction.NONE
+        self._schedule_db_action = DBAction.CREATE
+        self._item_identifier = ""
+        self._template_id = -1
+        self._schedule_ref = -1
+        self._schedule_date = QDate(0,0,0)
+        self._rotation = "N"
+        self._genre = -1
+
+        self._item_type = ItemType.SONG
+        self._title = item_title
+        self._item_identifier = f"SONG{self._time_stamp}"
+
+    def item_identifier(self) -> str:
+        return self._item_identifier
+
+    def generate_time_stamp(self) -> str:
+        rand_letters = "".join(random.choices(string.ascii_letters, k=15))
+        rand_ints = "".join(map(str, random.choices(range(100), k=18)))
+        rand_bytes = os.urandom(15)
+        hash_id = hashlib.sha256(rand_letters.encode()+rand_bytes+rand_ints.encode()).hexdigest()
+        return hash_id[0:20]
+
+
+def make_items(item_class, count: int, with_identifier: bool) -> list:
+    items = []
+    for i in range(count):
+        item = item_class("Song title")
+        if with_identifier:
+            item.item_identifier()
+        items.append(item)
+    return items
+
+
+def construction_us(item_class, count: int, with_identifier: bool) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    make_items(item_class, count, with_identifier)
+    return (time.perf_counter() - start) * 1e6 / count
+
+
+def bytes_per_item(item_class, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    items = make_items(item_class, count, True)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return held / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TemplateItem construction benchmark")
+    parser.add_argument("--items", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"Items: {args.items}")
+    print(f"{'':28}{'before':>12}{'after':>12}")
+    print(f"{'construct (us/item)':28}{construction_us(LegacySongItem, args.items, False):12.2f}"
+          f"{construction_us(SongItem, args.items, False):12.2f}")
+    print(f"{'construct + id (us/item)':28}{construction_us(LegacySongItem, args.items, True):12.2f}"
+          f"{construction_us(SongItem, args.items, True):12.2f}")
+    print(f"{'memory (bytes/item)':28}{bytes_per_item(LegacySongItem, args.items):12.0f}"
+          f"{bytes_per_item(SongItem, args.items):12.0f}")
+
+
+if __name__ == "__main__":
+    main()
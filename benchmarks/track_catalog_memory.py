@@ -0,0 +1,101 @@
+"""
+Memory used by the track catalog as a dict of Track objects and as a
+TrackCatalog, for a synthetic library.
+
+    python -m benchmarks.track_catalog_memory --tracks 200000 --folders 400
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from track import Track
+from track_catalog import TrackCatalog
+
+
+def make_rows(track_count: int, folder_count: int, seed: int = 1) -> list:
+    # Rows in TrackColumns order
+    rng = random.Random(seed)
+    artists = [f"Artist {i}" for i in range(track_count // 10 + 1)]
+    shows = ["", "", "", "1", "2,5", "3,4,7"]
+
+    rows = []
+    for track_id in range(1, track_count + 1):
+        folder_id = rng.randint(1, folder_count)
+        rows.append((track_id, f"Track title {track_id}", rng.choice(artists), rng.randint(20000, 420000),
+                     rng.randint(1, len(artists)), folder_id, f"\\\\media\\audio\\{folder_id}\\{track_id:08d}.ogg",
+                     rng.randint(1, 20), rng.choice(shows)))
+    return rows
+
+
+def build_dict_catalog(rows: list) -> dict:
+    tracks = {}
+    for row in rows:
+        track = Track(row[0])
+        track.set_title(row[1])
+        track.set_artist_name(row[2])
+        track.set_duration(row[3])
+        track.set_artist_id(row[4])
+        track.set_folder_id(row[5])
+        track.set_file_path(row[6])
+        track.set_genre(row[7])
+        track.set_show(row[8])
+
+        if row[5] not in tracks:
+            tracks[row[5]] = {}
+        tracks[row[5]][row[0]] = track
+    return tracks
+
+
+def measure(build, rows: list) -> tuple:
+    # Returns (bytes held by the result, build seconds). The build is timed
+    # separately, tracemalloc slows allocation down.
+    gc.collect()
+    start = time.perf_counter()
+    result = build(rows)
+    elapsed = time.perf_counter() - start
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = build(rows)
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return held, elapsed
+
+
+def scan_seconds(catalog, repeat: int = 3) -> float:
+    # Time to read the duration and genre of every track, folder by folder
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for folder in catalog.values():
+            for track in folder.values():
+                track.duration()
+                track.genre()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track catalog memory benchmark")
+    parser.add_argument("--tracks", type=int, default=200000)
+    parser.add_argument("--folders", type=int, default=400)
+    args = parser.parse_args()
+
+    rows = make_rows(args.tracks, args.folders)
+
+    dict_bytes, dict_secs = measure(build_dict_catalog, rows)
+    cat_bytes, cat_secs = measure(TrackCatalog.from_rows, rows)
+
+    print(f"Tracks: {args.tracks}, Folders: {args.folders}")
+    print(f"dict of Track : {dict_bytes / 1048576:8.1f} MB  build {dict_secs:6.2f}s  "
+          f"scan {scan_seconds(build_dict_catalog(rows)):6.2f}s")
+    print(f"TrackCatalog  : {cat_bytes / 1048576:8.1f} MB  build {cat_secs:6.2f}s  "
+          f"scan {scan_seconds(TrackCatalog.from_rows(rows)):6.2f}s")
+    print(f"Ratio         : {dict_bytes / cat_bytes:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
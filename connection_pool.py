@@ -0,0 +1,177 @@
+import time
+import threading
+
+from contextlib import contextmanager
+
+from db_backend import (
+    DatabaseBackend,
+    current_backend
+)
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of connections for one connection string, opened by
+    the DatabaseBackend in use (pyodbc for SQL Server).
+    Use ConnectionPool.for_connection_string() to share a pool between
+    all MSSQLData instances that connect to the same database.
+    """
+
+    MAX_SIZE = 8
+    IDLE_TIMEOUT = 300          # seconds an unused connection is kept open
+    HEALTH_CHECK_AFTER = 5      # seconds idle before a connection is checked on checkout
+    CHECKOUT_TIMEOUT = 30       # seconds to wait for a free connection
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, conn_str: str, max_size: int = MAX_SIZE, idle_timeout: int = IDLE_TIMEOUT,
+                 backend: DatabaseBackend = None):
+        self._conn_str = conn_str
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._backend = current_backend() if backend is None else backend
+        self._connect_func = self._backend.connect
+
+        # Idle connections as (connection, time returned to the pool), most recent last
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+
+    @classmethod
+    def for_connection_string(cls, conn_str: str, **kwargs) -> "ConnectionPool":
+        with cls._pools_lock:
+            if conn_str not in cls._pools:
+                cls._pools[conn_str] = cls(conn_str, **kwargs)
+            return cls._pools[conn_str]
+
+    @classmethod
+    def close_all_pools(cls):
+        with cls._pools_lock:
+            for pool in cls._pools.values():
+                pool.close_all()
+            cls._pools.clear()
+
+    def size(self) -> int:
+        return self._size
+
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    def acquire(self, timeout: float = CHECKOUT_TIMEOUT):
+        deadline = time.monotonic() + timeout
+
+        while True:
+            conn, returned_at = self._reserve(deadline)
+
+            if conn is None:
+                # A slot was reserved for a new connection
+                try:
+                    return self._connect_func(self._conn_str)
+                except Exception:
+                    self._release_slot()
+                    raise
+
+            if time.monotonic() - returned_at < ConnectionPool.HEALTH_CHECK_AFTER:
+                return conn
+
+            if self._is_healthy(conn):
+                return conn
+
+            self._close(conn)
+            self._release_slot()
+
+    def release(self, conn, discard: bool = False):
+        if not discard:
+            try:
+                # Leave no open transaction behind for the next borrower
+                conn.rollback()
+            except self._backend.Error:
+                discard = True
+
+        if discard:
+            self._close(conn)
+            self._release_slot()
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._close_expired()
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: float = CHECKOUT_TIMEOUT):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except self._backend.OperationalError:
+            # Connection level failure, do not hand this connection out again
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close_all(self):
+        with self._cond:
+            idle = self._idle
+            self._idle = []
+            self._size -= len(idle)
+            self._cond.notify_all()
+
+        for conn, returned_at in idle:
+            self._close(conn)
+
+    def _reserve(self, deadline: float) -> tuple:
+        # Returns (connection, returned_at) for an idle connection, or
+        # (None, 0) when a slot for a new connection has been reserved.
+        with self._cond:
+            while True:
+                self._close_expired()
+
+                if len(self._idle) > 0:
+                    return self._idle.pop()
+
+                if self._size < self._max_size:
+                    self._size += 1
+                    return None, 0
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(f"No database connection available after waiting. Pool size: {self._max_size}")
+                self._cond.wait(remaining)
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _close_expired(self):
+        # Called with the lock held. Oldest connections are at the front of the list.
+        now = time.monotonic()
+        while len(self._idle) > 0 and now - self._idle[0][1] > self._idle_timeout:
+            conn, returned_at = self._idle.pop(0)
+            self._size -= 1
+            self._close(conn)
+
+    def _is_healthy(self, conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except self._backend.Error:
+            return False
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except self._backend.Error:
+            pass
@@ -1,4 +1,6 @@
-import winreg
+import threading
+
+from collections.abc import Mapping
 
 from enum import (
     Enum,
@@ -9,6 +11,8 @@ from PyQt5.QtWidgets import (
     QComboBox
 )
 
+from db_backend import current_backend
+
 class ItemType(IntEnum):
     EMPTY = -1
     HEADER = 0
@@ -113,6 +117,9 @@ class RotationComboBox(QComboBox):
 
 
 def read_registry()->dict:
+    # Windows only, imported here so the other backends run anywhere
+    import winreg
+
     access_reg = winreg.ConnectRegistry(None, winreg.HKEY_LOCAL_MACHINE)
     access_key = winreg.OpenKey(access_reg, "SOFTWARE\\Proxima\\StudioONE\\Data")
     conn_str = winreg.QueryValueEx(access_key, "ConnectionString")
@@ -136,7 +143,34 @@ def read_registry()->dict:
     return conn
 
 
-MSSQL_CONN = read_registry()
+class ConnectionSettings(Mapping):
+    """
+    server, database, username and password of the database in use. They
+    are read from the backend when first used, not when this module is
+    imported, so nothing reads the registry until a connection is made.
+    """
+    def __init__(self, loader):
+        self._loader = loader
+        self._settings = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        with self._lock:
+            if self._settings is None:
+                self._settings = self._loader()
+            return self._settings
+
+    def __getitem__(self, key: str):
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+
+MSSQL_CONN = ConnectionSettings(lambda: current_backend().connection_settings())
 
 
 
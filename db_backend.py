@@ -0,0 +1,347 @@
+import os
+import re
+import sqlite3
+import datetime
+import threading
+import configparser
+
+
+# The backend is chosen by the environment variable, then by the [database]
+# section of the config file, then defaults to SQL Server:
+#
+#   [database]
+#   backend = sqlite
+#   sqlite_database = data/studioone.db
+#
+BACKEND_ENV = "AUTO_SCHEDULER_BACKEND"
+SQLITE_DATABASE_ENV = "AUTO_SCHEDULER_SQLITE_DB"
+CONFIG_FILE = "auto_scheduler.ini"
+
+MSSQL, SQLITE = "mssql", "sqlite"
+
+DEFAULT_SQLITE_DATABASE = "data/studioone.db"
+
+
+class DatabaseBackend:
+    """
+    Where MSSQLData gets its connections from. A backend reads the
+    connection settings, builds the connection string, opens DB-API
+    connections and names the exceptions they raise.
+    """
+
+    NAME = ""
+
+    # DB-API exception classes of the backend's driver
+    Error = Exception
+    OperationalError = Exception
+
+    def name(self) -> str:
+        return self.NAME
+
+    def connection_settings(self) -> dict:
+        # {server, database, username, password}, as MSSQL_CONN
+        raise NotImplementedError
+
+    def connection_string(self, server: str, database: str, username: str, password: str) -> str:
+        raise NotImplementedError
+
+    def connect(self, conn_str: str):
+        raise NotImplementedError
+
+    def create_table_sql(self, table: str, columns: str) -> str:
+        # CREATE TABLE that does nothing when the table exists
+        raise NotImplementedError
+
+
+class MSSQLBackend(DatabaseBackend):
+    """
+    The StudioONE SQL Server, settings from the registry, through pyodbc.
+    """
+
+    NAME = MSSQL
+
+    SQL_DRIVER = "{ODBC Driver 18 for SQL Server}"
+
+    def __init__(self):
+        import pyodbc
+        self._pyodbc = pyodbc
+        self.Error = pyodbc.Error
+        self.OperationalError = pyodbc.OperationalError
+
+    def connection_settings(self) -> dict:
+        from data_types import read_registry
+        return read_registry()
+
+    def connection_string(self, server: str, database: str, username: str, password: str) -> str:
+        return (f"DRIVER={MSSQLBackend.SQL_DRIVER};"
+                f"TrustServerCertificate=yes;"
+                f"SERVER={server};"
+                f"DATABASE={database};"
+                f"UID={username};"
+                f"PWD={password};"
+                )
+
+    def connect(self, conn_str: str):
+        return self._pyodbc.connect(conn_str)
+
+    def create_table_sql(self, table: str, columns: str) -> str:
+        return f"IF OBJECT_ID('{table}', 'U') IS NULL CREATE TABLE {table} ({columns})"
+
+
+# T-SQL used by the application that SQLite does not understand
+_OUTPUT_INSERTED = re.compile(r"\s+OUTPUT\s+INSERTED\.(\w+)", re.IGNORECASE)
+_CAST_AS_DATE = re.compile(r"CAST\(\s*([\w.]+)\s+AS\s+DATE\s*\)", re.IGNORECASE)
+
+
+def translate_tsql(sql: str) -> str:
+    # "INSERT ... OUTPUT INSERTED.id VALUES (...)" returns the new id with
+    # RETURNING. The date columns are stored as dates already, a CAST is
+    # dropped so the column keeps its declared type and its converter.
+    match = _OUTPUT_INSERTED.search(sql)
+    if match is not None:
+        sql = _OUTPUT_INSERTED.sub("", sql).rstrip().rstrip(";") + f" RETURNING {match.group(1)}"
+
+    return _CAST_AS_DATE.sub(r"\1", sql)
+
+
+# Columns declared DATE and TIME are returned as datetime.date and
+# datetime.time, like pyodbc does for SQL Server, the code calls strftime on them.
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime.time, lambda value: value.isoformat())
+sqlite3.register_converter("DATE", lambda value: datetime.date.fromisoformat(value.decode()[:10]))
+sqlite3.register_converter("TIME", lambda value: datetime.time.fromisoformat(value.decode()))
+
+
+def _split_statements(sql: str) -> list:
+    # Semicolons within string literals do not end a statement
+    statements = []
+    statement = ""
+    for part in sql.split(";"):
+        statement += part + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip(" \t\r\n;"):
+                statements.append(statement)
+            statement = ""
+    if statement.strip(" \t\r\n;"):
+        statements.append(statement)
+    return statements
+
+
+class _SQLiteCursor:
+    # The parts of a pyodbc cursor that the application uses
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+        # pyodbc option, rows are always bound in one call here
+        self.fast_executemany = False
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def execute(self, sql: str, params=()):
+        sql = translate_tsql(sql)
+        try:
+            self._cursor.execute(sql, params)
+        except (sqlite3.ProgrammingError, sqlite3.Warning):
+            # A batch of several statements, as SQL Server accepts. They run
+            # one by one, executescript would commit the open transaction.
+            if len(params) > 0:
+                raise
+            for statement in _split_statements(sql):
+                self._cursor.execute(statement)
+        return self
+
+    def executemany(self, sql: str, param_rows):
+        self._cursor.executemany(translate_tsql(sql), param_rows)
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self) -> list:
+        return self._cursor.fetchall()
+
+    def fetchval(self):
+        row = self._cursor.fetchone()
+        return None if row is None else row[0]
+
+    def close(self):
+        self._cursor.close()
+
+
+class _SQLiteConnection:
+    def __init__(self, con: sqlite3.Connection):
+        self._con = con
+
+    def cursor(self) -> _SQLiteCursor:
+        return _SQLiteCursor(self._con.cursor())
+
+    def commit(self):
+        self._con.commit()
+
+    def rollback(self):
+        self._con.rollback()
+
+    def close(self):
+        self._con.close()
+
+
+class SQLiteBackend(DatabaseBackend):
+    """
+    Local stand-in for the StudioONE and Traffik tables the application
+    uses, in one SQLite file. Table and column names are those of the SQL
+    Server schema, so the same statements run against both. Used to run
+    generation, saves and validations at production volumes without the
+    on-air database, see benchmarks/seed_sqlite.py to fill it.
+    """
+
+    NAME = SQLITE
+
+    Error = sqlite3.Error
+    OperationalError = sqlite3.OperationalError
+
+    # Seconds a connection waits for another one to finish writing
+    BUSY_TIMEOUT = 30
+
+    SCHEMA = [
+        ("CREATE TABLE IF NOT EXISTS Tracks ("
+         " TrackReference INTEGER PRIMARY KEY, TrackTitle TEXT, ArtistSearch TEXT, Duration INTEGER, "
+         " ArtistID_1 INTEGER, FolderID INTEGER, FilePath TEXT, Genre INTEGER, TrackPrimeNote TEXT, "
+         " TrackDeleted INTEGER NOT NULL DEFAULT 0)"),
+
+        "CREATE TABLE IF NOT EXISTS tree (NodeID INTEGER PRIMARY KEY, NodeName TEXT, NodeParent INTEGER)",
+
+        ("CREATE TABLE IF NOT EXISTS TemplateHeader ("
+         " id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, description TEXT, hours TEXT, dow TEXT, "
+         " filler_folder INTEGER)"),
+
+        ("CREATE TABLE IF NOT EXISTS TemplateItem ("
+         " id INTEGER PRIMARY KEY AUTOINCREMENT, item_type INTEGER, start_time TEXT, hour INTEGER, "
+         " duration INTEGER, title TEXT, artist_id INTEGER, artist_name TEXT, folder_id INTEGER, "
+         " item_path TEXT, item_id INTEGER, item_row INTEGER, item_identifier TEXT, template_id INTEGER, "
+         " folder_name TEXT, rotation TEXT, genre INTEGER)"),
+
+        ("CREATE TABLE IF NOT EXISTS Schedule ("
+         " ScheduleReference INTEGER PRIMARY KEY AUTOINCREMENT, ScheduleService INTEGER, "
+         " ScheduleLineRef INTEGER, ScheduleDate DATE, ScheduleTime TIME, ScheduleHour INTEGER, "
+         " ScheduleHourTime INTEGER, ScheduleTrackReference INTEGER, ScheduledFadeIn INTEGER, "
+         " ScheduledFadeOut INTEGER, ScheduledFadeDelay INTEGER, PlayStatus TEXT DEFAULT '', "
+         " AutoTransition INTEGER, LiveTransition INTEGER, ItemSource TEXT, ScheduleCommMediaType TEXT, "
+         " BookedSpots INTEGER DEFAULT 0)"),
+
+        ("CREATE TABLE IF NOT EXISTS AutoSchedule ("
+         " id INTEGER PRIMARY KEY AUTOINCREMENT, schedule_ref INTEGER, schedule_date DATE, "
+         " template_id INTEGER, start_time TIME, schedule_hour INTEGER, item_identifier TEXT, "
+         " item_type INTEGER, duration INTEGER, title TEXT, artist_id INTEGER, artist_name TEXT, "
+         " folder_id INTEGER, folder_name TEXT, track_id INTEGER, filepath TEXT, item_row INTEGER)"),
+
+        ("CREATE TABLE IF NOT EXISTS Spots ("
+         " SpotRef INTEGER PRIMARY KEY AUTOINCREMENT, SpotBookedDuration INTEGER)"),
+
+        ("CREATE TABLE IF NOT EXISTS SpotBookings ("
+         " SpotBookingRef INTEGER PRIMARY KEY AUTOINCREMENT, SpotBookingBreakRef INTEGER, "
+         " SpotBookingSpot INTEGER, SpotBookingPlayStatus TEXT DEFAULT '')"),
+
+        "CREATE INDEX IF NOT EXISTS ix_schedule_date_hour ON Schedule (ScheduleDate, ScheduleHour)",
+        "CREATE INDEX IF NOT EXISTS ix_autoschedule_date_hour ON AutoSchedule (schedule_date, schedule_hour)",
+        "CREATE INDEX IF NOT EXISTS ix_autoschedule_ref ON AutoSchedule (schedule_ref)",
+        "CREATE INDEX IF NOT EXISTS ix_autoschedule_template ON AutoSchedule (template_id, schedule_date)",
+        "CREATE INDEX IF NOT EXISTS ix_templateitem_template ON TemplateItem (template_id, hour, item_row)",
+        "CREATE INDEX IF NOT EXISTS ix_spotbookings_break ON SpotBookings (SpotBookingBreakRef)",
+        "CREATE INDEX IF NOT EXISTS ix_tracks_folder ON Tracks (FolderID, TrackReference)"
+    ]
+
+    _created = set()
+    _created_lock = threading.Lock()
+
+    def __init__(self, database: str = DEFAULT_SQLITE_DATABASE):
+        self._database = database
+
+    def database(self) -> str:
+        return self._database
+
+    def connection_settings(self) -> dict:
+        return {
+            "server": "",
+            "database": self._database,
+            "username": "",
+            "password": ""
+        }
+
+    def connection_string(self, server: str, database: str, username: str, password: str) -> str:
+        return database
+
+    def connect(self, conn_str: str) -> _SQLiteConnection:
+        # Pooled connections are used by one thread at a time, not always
+        # the one that opened them.
+        con = sqlite3.connect(conn_str, timeout=SQLiteBackend.BUSY_TIMEOUT,
+                              detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+
+        # There is no rowversion column in SQLite, an empty
+        # INFORMATION_SCHEMA.COLUMNS tells MSSQLData so.
+        con.execute("ATTACH DATABASE ':memory:' AS INFORMATION_SCHEMA")
+        con.execute("CREATE TABLE INFORMATION_SCHEMA.COLUMNS (TABLE_NAME TEXT, COLUMN_NAME TEXT, DATA_TYPE TEXT)")
+
+        self._create_schema(con, conn_str)
+        return _SQLiteConnection(con)
+
+    def create_table_sql(self, table: str, columns: str) -> str:
+        return f"CREATE TABLE IF NOT EXISTS {table} ({columns})"
+
+    def _create_schema(self, con: sqlite3.Connection, conn_str: str):
+        with SQLiteBackend._created_lock:
+            if conn_str in SQLiteBackend._created:
+                return
+
+            # Readers do not block the writer, validations can run during a save
+            con.execute("PRAGMA journal_mode=WAL")
+            for stmt in SQLiteBackend.SCHEMA:
+                con.execute(stmt)
+            con.commit()
+
+            SQLiteBackend._created.add(conn_str)
+
+
+def _read_config(config_file: str) -> dict:
+    parser = configparser.ConfigParser()
+    parser.read(config_file)
+    if not parser.has_section("database"):
+        return {}
+    return dict(parser.items("database"))
+
+
+def make_backend(name: str = None, config_file: str = CONFIG_FILE) -> DatabaseBackend:
+    config = _read_config(config_file)
+
+    if name is None:
+        name = os.environ.get(BACKEND_ENV) or config.get("backend", MSSQL)
+    name = name.strip().lower()
+
+    if name == SQLITE:
+        database = os.environ.get(SQLITE_DATABASE_ENV) or config.get("sqlite_database", DEFAULT_SQLITE_DATABASE)
+        return SQLiteBackend(database)
+
+    if name == MSSQL:
+        return MSSQLBackend()
+
+    raise ValueError(f"Unknown database backend `{name}`, expected `{MSSQL}` or `{SQLITE}`")
+
+
+_current = None
+_current_lock = threading.Lock()
+
+
+def current_backend() -> DatabaseBackend:
+    # Chosen once per process, on first use
+    global _current
+    with _current_lock:
+        if _current is None:
+            _current = make_backend()
+        return _current
+
+
+def set_backend(backend: DatabaseBackend):
+    # For tools that pick the backend themselves, before any connection is made
+    global _current
+    with _current_lock:
+        _current = backend
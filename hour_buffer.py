@@ -0,0 +1,60 @@
+ONE_HOUR_MS = 3600000
+
+
+class HourBuffer:
+    """
+    Items of one schedule hour with a running total of their durations, so
+    fit checks and the remaining time are O(1) instead of a sum over the
+    items already placed.
+    """
+    def __init__(self, hour: int, items: list = None, capacity: int = ONE_HOUR_MS):
+        self._hour = hour
+        self._capacity = capacity
+        self._items = []
+        self._total_duration = 0
+
+        if items is not None:
+            self.extend(items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, index: int) -> "TemplateItem":
+        return self._items[index]
+
+    def hour(self) -> int:
+        return self._hour
+
+    def items(self) -> list:
+        return self._items
+
+    def append(self, item: "TemplateItem"):
+        self._items.append(item)
+        self._total_duration += item.duration()
+
+    def extend(self, items: list):
+        for item in items:
+            self.append(item)
+
+    def pop(self, index: int = -1) -> "TemplateItem":
+        item = self._items.pop(index)
+        self._total_duration -= item.duration()
+        return item
+
+    def total_duration(self) -> int:
+        return self._total_duration
+
+    def remaining(self) -> int:
+        return self._capacity - self._total_duration
+
+    def fits(self, duration: int) -> bool:
+        return self._total_duration + duration <= self._capacity
+
+    def is_full(self) -> bool:
+        return self._total_duration >= self._capacity
+
+    def overflows(self) -> bool:
+        return self._total_duration > self._capacity
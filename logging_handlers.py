@@ -1,13 +1,28 @@
+import time
+import queue
+import atexit
+import logging
+import threading
 
 from PyQt5.QtCore import (
     QDir,
     QDateTime
 )
 
+# stdlib logger that EventLogger messages are also sent to, with their
+# structured fields (date, hour, template...) as record attributes. The
+# application adds handlers to it, the NullHandler keeps it quiet otherwise.
+LOGGER_NAME = "auto_scheduler"
+logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
+
+
 class StreamHandler:
     def log(self, msg: str):
         raise NotImplementedError
 
+    def close(self):
+        pass
+
 class StdOutHandler(StreamHandler):
     def log(self, msg: str):
         print(msg)
@@ -36,14 +51,164 @@ class FileHandler(StreamHandler):
             lf.write(msg)
             lf.write('\n')
 
+
+class _FlushRequest:
+    def __init__(self):
+        self.done = threading.Event()
+
+_STOP = object()
+
+
+class BackgroundFileWriter:
+    """
+    Appends lines to a log file from a background thread. Lines are queued
+    by the callers and written in batches, one open of the file per batch,
+    when BATCH_SIZE lines are pending, FLUSH_INTERVAL seconds have passed
+    or the writer is flushed or closed.
+
+    There is one writer per file, see for_file().
+    """
+
+    BATCH_SIZE = 200
+    FLUSH_INTERVAL = 1.0
+
+    _writers = {}
+    _writers_lock = threading.Lock()
+
+    def __init__(self, filepath: str, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self._filepath = filepath
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name=f"log-writer {filepath}", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def for_file(cls, filepath: str) -> "BackgroundFileWriter":
+        with cls._writers_lock:
+            writer = cls._writers.get(filepath)
+            if writer is None or writer._closed:
+                writer = cls(filepath)
+                cls._writers[filepath] = writer
+            return writer
+
+    @classmethod
+    def close_all(cls):
+        with cls._writers_lock:
+            writers = list(cls._writers.values())
+            cls._writers.clear()
+
+        for writer in writers:
+            writer.close()
+
+    def filepath(self) -> str:
+        return self._filepath
+
+    def write(self, line: str):
+        if self._closed:
+            # Late messages after shutdown are written directly
+            self._write_lines([line])
+            return
+        self._queue.put(line)
+
+    def flush(self, timeout: float = None):
+        # Blocks until the lines queued so far are in the file
+        if self._closed:
+            return
+        request = _FlushRequest()
+        self._queue.put(request)
+        request.done.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+        with BackgroundFileWriter._writers_lock:
+            if BackgroundFileWriter._writers.get(self._filepath) is self:
+                del BackgroundFileWriter._writers[self._filepath]
+
+    def _run(self):
+        pending = []
+        deadline = time.monotonic() + self._flush_interval
+
+        while True:
+            try:
+                entry = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                entry = None
+
+            if entry is _STOP:
+                self._write_lines(pending)
+                return
+
+            if isinstance(entry, _FlushRequest):
+                self._write_lines(pending)
+                pending = []
+                entry.done.set()
+                continue
+
+            if entry is not None:
+                pending.append(entry)
+
+            if len(pending) >= self._batch_size or time.monotonic() >= deadline:
+                self._write_lines(pending)
+                pending = []
+                deadline = time.monotonic() + self._flush_interval
+
+    def _write_lines(self, lines: list):
+        if len(lines) == 0:
+            return
+        try:
+            with open(self._filepath, 'a') as lf:
+                lf.write('\n'.join(lines))
+                lf.write('\n')
+        except OSError as e:
+            print(f"Error writing log file {self._filepath}: {e}")
+
+atexit.register(BackgroundFileWriter.close_all)
+
+
+class QueuedFileHandler(FileHandler):
+    """
+    FileHandler that hands the messages to the BackgroundFileWriter of its
+    file instead of opening the file for each message.
+    """
+    def __init__(self, filepath: str=''):
+        super(QueuedFileHandler, self).__init__(filepath)
+        self._writer = BackgroundFileWriter.for_file(self.log_file)
+
+    def log(self, msg: str):
+        self._writer.write(msg)
+
+    def flush(self):
+        self._writer.flush()
+
+    def close(self):
+        # Writes the pending lines and stops the writer thread of the file
+        self._writer.close()
+
+
 class EventLogger:
     def __init__(self, handler:StreamHandler=StdOutHandler):
         self.stream_handler =  handler()
+        self._logger = logging.getLogger(LOGGER_NAME)
 
-    def log_error(self, msg: str):
+    def log_error(self, msg: str, **fields):
         log_msg = 'ERROR: {}'.format(msg)
         self.stream_handler.log(log_msg)
+        if self._logger.isEnabledFor(logging.ERROR):
+            self._logger.error(msg, extra={"fields": fields, **fields})
 
-    def log_info(self, msg: str):
+    def log_info(self, msg: str, **fields):
         log_msg = 'INFO: {}'.format(msg)
-        self.stream_handler.log(log_msg)
\ No newline at end of file
+        self.stream_handler.log(log_msg)
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(msg, extra={"fields": fields, **fields})
+
+    def close(self):
+        self.stream_handler.close()
@@ -1,6 +1,7 @@
-import pyodbc
-
-from PyQt5.QtCore import QDate
+from PyQt5.QtCore import (
+    QDate,
+    QTime
+)
 
 from collections import OrderedDict
 
@@ -9,7 +10,9 @@ from data_types import (
     TemplateColumns,
     TemplateItemColumns,
     ItemType,
-    ScheduleColumns
+    ScheduleColumns,
+    CommercialColumn,
+    TrackColumns
 )
 
 from template import (
@@ -20,29 +23,40 @@ from template_item import (
     HeaderItem,
     BlankItem,
     FolderItem,
-    SongItem
+    SongItem,
+    CommercialBreakItem
 )
 
+from track import make_track
+from track_catalog import TrackCatalog
+
 from data_types import MSSQL_CONN
 
+from connection_pool import (
+    ConnectionPool,
+    PoolTimeoutError
+)
+
+from db_backend import (
+    DatabaseBackend,
+    current_backend
+)
+
 
 class MSSQLData:
-    def __init__(self, server, database, username, password):
+    def __init__(self, server, database, username, password, backend: DatabaseBackend = None):
         self._server = server.strip()      
         self._database = database.strip()  
         self._username = username.strip()  
         self._password = password.strip()  
-        self._sql_driver ="{ODBC Driver 18 for SQL Server}"
 
-        self.conn_str = (f"DRIVER={self._sql_driver};"
-                        f"TrustServerCertificate=yes;"
-                        f"SERVER={self._server};"
-                        f"DATABASE={self._database};"
-                        f"UID={self._username};"
-                        f"PWD={self._password};"
-                        )
+        # SQL Server, or the SQLite stand-in, see db_backend
+        self._backend = current_backend() if backend is None else backend
 
-        self.conn = None
+        self.conn_str = self._backend.connection_string(self._server, self._database,
+                                                        self._username, self._password)
+
+        self._pool = ConnectionPool.for_connection_string(self.conn_str, backend=self._backend)
 
     def database(self):
         return self._database
@@ -51,66 +65,113 @@ class MSSQLData:
         return self._server
 
     def connect(self):
+        # Connections are borrowed from the shared pool for each statement.
+        # connect() only checks that the database can be reached.
         try:
-            self.conn = pyodbc.connect(self.conn_str)
-            return True
-        except pyodbc.Error as ex:
+            with self._pool.connection():
+                return True
+        except (self._backend.Error, PoolTimeoutError) as ex:
             sqlstate = ex.args[0]
             print(f"Error connecting to database: {sqlstate}")
             return False
 
     def disconnect(self):
-        if self.conn:
-            self.conn.close()
-            self.conn = None
-
-    def execute_query(self, query: str):
-        if not self.conn:
-            if not self.connect():
-                return None
-        cursor = self.conn.cursor()
+        # Nothing to close, connections go back to the pool after each statement
+        pass
+
+    def pool(self) -> ConnectionPool:
+        return self._pool
+
+    def backend(self) -> DatabaseBackend:
+        return self._backend
+
+    def execute_query(self, query: str, params: tuple = ()):
         try:
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            return rows
-        except pyodbc.Error as ex:
+            with self._pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+                return rows
+        except (self._backend.Error, PoolTimeoutError) as ex:
             sqlstate = ex.args[0]
             print(f"Error executing query: {sqlstate}")
             return None
 
-    def execute_non_query(self, query) ->tuple:
-        if not self.conn:
-            if not self.connect():
-                return False
-        cursor = self.conn.cursor()
+    def execute_non_query(self, query, params: tuple = ()) ->tuple:
         try:
-            cursor.execute(query)
-            self.conn.commit()
-        except pyodbc.Error as ex:
+            with self._pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                conn.commit()
+        except (self._backend.Error, PoolTimeoutError) as ex:
             sqlstate = ex.args[0]
             msg = f"Error executing non-query: {sqlstate}"
             return False,msg
 
         return True,"OK"
 
+    def execute_many(self, statements: list, batch_size: int = 1000) ->tuple:
+        # Runs a list of (sql, param_rows) in a single transaction. Rows are sent
+        # as parameter arrays, `batch_size` rows per round trip.
+        try:
+            with self._pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.fast_executemany = True
+                try:
+                    for sql, param_rows in statements:
+                        for i in range(0, len(param_rows), batch_size):
+                            cursor.executemany(sql, param_rows[i:i + batch_size])
+                    conn.commit()
+                except self._backend.Error:
+                    conn.rollback()
+                    raise
+                finally:
+                    cursor.close()
+        except (self._backend.Error, PoolTimeoutError) as ex:
+            sqlstate = ex.args[0]
+            msg = f"Error executing batch: {sqlstate}"
+            return False,msg
+
+        return True,"OK"
+
+    def execute_row_count(self, query: str, params: tuple = ()) -> int:
+        # Runs an INSERT, UPDATE or DELETE, returns the number of rows it
+        # affected or -1 if it fails
+        try:
+            with self._pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                row_count = cursor.rowcount
+                conn.commit()
+        except (self._backend.Error, PoolTimeoutError) as ex:
+            sqlstate = ex.args[0]
+            print(f"Error executing statement: {sqlstate}")
+            return -1
+
+        return row_count
+
     def execute_insert(self, query) ->int:
-        if not self.conn:
-            if not self.connect():
-                return -1
-        cursor = self.conn.cursor()
         new_id = -1
         try:
-            cursor.execute(query)
-            new_id = cursor.fetchval()
-            self.conn.commit()
-        except pyodbc.Error as ex:
+            with self._pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query)
+                new_id = cursor.fetchval()
+                conn.commit()
+        except (self._backend.Error, PoolTimeoutError) as ex:
             sqlstate = ex.args[0]
             print(f"Error executing insert: {sqlstate}")
             return -1
 
         return new_id
 
+    TEMPLATE_ITEM_COLUMNS = ("id, item_type, start_time, hour, duration, title, "
+                             " artist_id, artist_name, folder_id, item_path, item_id, "
+                             " item_row, item_identifier, template_id, folder_name, rotation, genre ")
+
     def fetch_all_templates(self) ->dict:
+        # Headers and items are read with one query each, not one query
+        # per template for the items.
         templates = {}
 
         sel_stmt = f"Select id, name, description, hours, dow, filler_folder From templateheader;"
@@ -119,9 +180,11 @@ class MSSQLData:
         if rows is None:
             return templates
 
+        items_by_template = self.fetch_all_template_items()
+
         for row in rows:
             template = self._make_template(row)
-            items = self.fetch_template_items(template)
+            items = items_by_template.get(template.id(), OrderedDict())
 
             items_with_blanks = self._insert_blank_rows(items)
             template.assign_items(items_with_blanks)
@@ -130,15 +193,38 @@ class MSSQLData:
 
         return templates
 
+    def fetch_all_template_items(self) -> dict:
+        # {template_id: OrderedDict(item_identifier -> item)}, items in hour and row order
+        items_by_template = {}
+
+        sel_stmt = (f"Select {MSSQLData.TEMPLATE_ITEM_COLUMNS} "
+                    f" From templateitem order by template_id, hour, item_row;")
+
+        rows = self.execute_query(sel_stmt)
+
+        if rows is None:
+            return items_by_template
+
+        for row in rows:
+            item = self._make_template_item(row)
+
+            if item is None:
+                continue
+
+            if item.template_id() not in items_by_template:
+                items_by_template[item.template_id()] = OrderedDict()
+
+            items_by_template[item.template_id()][item.item_identifier()] = item
+
+        return items_by_template
+
     def fetch_template_items(self, template) ->OrderedDict:
             items = OrderedDict()
 
-            sel_stmt = (f"Select id, item_type, start_time, hour, duration, title, "
-                        f" artist_id, artist_name, folder_id, item_path, item_id, "
-                        f" item_row, item_identifier, template_id, folder_name, rotation, genre "
-                        f" From templateitem Where template_id = {template.id()} order by hour, item_row;")
+            sel_stmt = (f"Select {MSSQLData.TEMPLATE_ITEM_COLUMNS} "
+                        f" From templateitem Where template_id = ? order by hour, item_row;")
 
-            rows = self.execute_query(sel_stmt)
+            rows = self.execute_query(sel_stmt, (template.id(),))
 
             for row in rows:
                 item = self._make_template_item(row)
@@ -150,6 +236,100 @@ class MSSQLData:
 
             return items
 
+    TRACK_COLUMNS = ("TrackReference, TrackTitle, ArtistSearch, "
+                     " Duration, ArtistID_1, FolderID, FilePath, Genre, TrackPrimeNote ")
+
+    TRACK_IS_ACTIVE = ("ArtistID_1 is not Null"
+                       " AND FolderID > 0 "
+                       " AND TrackDeleted = 0 ")
+
+    def fetch_tracks(self) -> dict:
+        # Returns a TrackCatalog or None if the query fails
+        sql = (f"SELECT {MSSQLData.TRACK_COLUMNS} "
+               f" FROM Tracks "
+               f" WHERE {MSSQLData.TRACK_IS_ACTIVE}"
+               f" ORDER BY Folderid, TrackReference ")
+
+        rows = self.execute_query(sql)
+
+        if rows is None:
+            return None
+
+        return TrackCatalog.from_rows(rows)
+
+    def tracks_rowversion_column(self) -> str:
+        # Name of the rowversion column on Tracks, None if the table has none
+        sql = ("SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS "
+               " WHERE TABLE_NAME = 'Tracks' AND DATA_TYPE IN ('timestamp', 'rowversion')")
+
+        rows = self.execute_query(sql)
+
+        if rows is None or len(rows) == 0:
+            return None
+
+        return rows[0][0]
+
+    def fetch_track_marks(self, rowversion_column: str = None) -> tuple:
+        # Returns (max TrackReference, max rowversion) or None if the query fails
+        max_rowversion = "NULL" if rowversion_column is None else f"MAX({rowversion_column})"
+
+        rows = self.execute_query(f"SELECT MAX(TrackReference), {max_rowversion} FROM Tracks")
+
+        if rows is None or len(rows) == 0:
+            return None
+
+        max_track_ref = rows[0][0] if rows[0][0] is not None else 0
+        return int(max_track_ref), rows[0][1]
+
+    def fetch_track_changes(self, rowversion_column: str, since_rowversion: bytes) -> tuple:
+        # Tracks inserted, updated or deleted after `since_rowversion`.
+        # Returns ([Track], [removed track_id]) or None if the query fails.
+        sql = (f"SELECT {MSSQLData.TRACK_COLUMNS}, "
+               f" CASE WHEN {MSSQLData.TRACK_IS_ACTIVE} THEN 1 ELSE 0 END "
+               f" FROM Tracks "
+               f" WHERE {rowversion_column} > ? ")
+
+        rows = self.execute_query(sql, (since_rowversion,))
+
+        if rows is None:
+            return None
+
+        IS_ACTIVE = len(TrackColumns)
+
+        tracks = []
+        removed = []
+
+        for row in rows:
+            if row[IS_ACTIVE] == 1:
+                tracks.append(make_track(row))
+            else:
+                removed.append(int(row[int(TrackColumns.TRACK_REFERENCE)]))
+
+        return tracks, removed
+
+    def fetch_tracks_after(self, track_ref: int) -> list:
+        # Active tracks added after `track_ref`, None if the query fails
+        sql = (f"SELECT {MSSQLData.TRACK_COLUMNS} "
+               f" FROM Tracks "
+               f" WHERE {MSSQLData.TRACK_IS_ACTIVE}"
+               f" AND TrackReference > ? ")
+
+        rows = self.execute_query(sql, (track_ref,))
+
+        if rows is None:
+            return None
+
+        return [make_track(row) for row in rows]
+
+    def fetch_track_ids(self) -> set:
+        # Ids of all active tracks, None if the query fails
+        rows = self.execute_query(f"SELECT TrackReference FROM Tracks WHERE {MSSQLData.TRACK_IS_ACTIVE}")
+
+        if rows is None:
+            return None
+
+        return {int(row[0]) for row in rows}
+
     def fetch_schedule_by_template_and_date_range(self, template_id: int, start_date: QDate, end_date: QDate) -> list:
         self.mssql_conn = self._make_mssql_connection()
 
@@ -183,6 +363,181 @@ class MSSQLData:
 
         return schedule_items
 
+    # Copies the generated songs to the Sedric schedule on the server, the
+    # rows do not go through the client.
+    PROMOTE_AUTO_SCHEDULE = ("INSERT INTO Schedule (ScheduleService, ScheduleLineRef, ScheduleDate, "
+                             " ScheduleTime, ScheduleHour, ScheduleHourTime, ScheduleTrackReference, "
+                             " ScheduledFadeIn, ScheduledFadeOut, ScheduledFadeDelay, PlayStatus, "
+                             " AutoTransition, LiveTransition, ItemSource, ScheduleCommMediaType) "
+                             " SELECT 1, schedule_ref, schedule_date, start_time, "
+                             " schedule_hour, item_row, track_id, 0, 0, 0, "
+                             " 'CUED', 1, 1, 'SONG', 'AUDIO' "
+                             " FROM AutoSchedule "
+                             " WHERE schedule_date IN ({dates}) "
+                             " AND schedule_hour IN ({hours}) "
+                             " AND duration > 0 "
+                             " ORDER BY schedule_date, schedule_hour, item_row")
+
+    def promote_auto_schedule(self, dates: list, hours: list) -> int:
+        # One INSERT ... SELECT for all the dates (yyyy-MM-dd) and hours.
+        # Returns the number of Schedule rows added, -1 if it fails.
+        sql = MSSQLData.PROMOTE_AUTO_SCHEDULE.format(dates=", ".join("?" * len(dates)),
+                                                     hours=", ".join("?" * len(hours)))
+
+        return self.execute_row_count(sql, tuple(dates) + tuple(hours))
+
+    # Content fingerprint of each saved (date, hour), see ScheduleUpdater.
+    # An hour whose fingerprint has not changed is not written again.
+    SCHEDULE_FINGERPRINT_COLUMNS = ("schedule_date DATE NOT NULL, schedule_hour INT NOT NULL, "
+                                    " fingerprint VARCHAR(64) NOT NULL, "
+                                    " PRIMARY KEY (schedule_date, schedule_hour)")
+
+    SCHEDULE_FINGERPRINT_INSERT = ("INSERT INTO AutoScheduleFingerprint (schedule_date, schedule_hour, fingerprint) "
+                                   " VALUES (?, ?, ?)")
+
+    SCHEDULE_FINGERPRINT_DELETE = ("DELETE FROM AutoScheduleFingerprint "
+                                   " WHERE schedule_date IN ({dates}) AND schedule_hour IN ({hours})")
+
+    def create_schedule_fingerprint_table(self) -> bool:
+        sql = self._backend.create_table_sql("AutoScheduleFingerprint", MSSQLData.SCHEDULE_FINGERPRINT_COLUMNS)
+        status, msg = self.execute_non_query(sql)
+        if not status:
+            print(msg)
+        return status
+
+    def fetch_schedule_fingerprints(self, dates: list) -> dict:
+        # {(yyyy-MM-dd, hour): fingerprint} of the saved hours of the dates,
+        # None if the query fails
+        sql = (f"SELECT schedule_date, schedule_hour, fingerprint "
+               f" FROM AutoScheduleFingerprint "
+               f" WHERE schedule_date IN ({', '.join('?' * len(dates))})")
+
+        rows = self.execute_query(sql, tuple(dates))
+
+        if rows is None:
+            return None
+
+        return {(row[0].strftime("%Y-%m-%d"), int(row[1])): row[2] for row in rows}
+
+    def delete_schedule_fingerprints(self, dates: list, hours: list) -> tuple:
+        # The hours are written again by the next save, whatever their content
+        sql = MSSQLData.SCHEDULE_FINGERPRINT_DELETE.format(dates=", ".join("?" * len(dates)),
+                                                           hours=", ".join("?" * len(hours)))
+        return self.execute_non_query(sql, tuple(dates) + tuple(hours))
+
+    # Reservation table of the schedule references, see ScheduleRefAllocator.
+    # next_ref is the first reference not handed out yet.
+    SCHEDULE_REF_COLUMNS = "name VARCHAR(32) NOT NULL PRIMARY KEY, next_ref BIGINT NOT NULL"
+
+    SCHEDULE_REF_NAME = "schedule_ref"
+
+    # Updating the row locks it, two clients never get the same block
+    SCHEDULE_REF_RESERVE = ("UPDATE ScheduleRefBlock SET next_ref = next_ref + ? "
+                            " OUTPUT INSERTED.next_ref WHERE name = ?")
+
+    # The first block starts after the references saved before the table existed
+    SCHEDULE_REF_SEED = ("INSERT INTO ScheduleRefBlock (name, next_ref) "
+                         " SELECT ?, COALESCE(MAX(schedule_ref), 0) + 1 FROM AutoSchedule "
+                         " WHERE NOT EXISTS (SELECT name FROM ScheduleRefBlock WHERE name = ?)")
+
+    def create_schedule_ref_table(self) -> bool:
+        sql = self._backend.create_table_sql("ScheduleRefBlock", MSSQLData.SCHEDULE_REF_COLUMNS)
+        status, msg = self.execute_non_query(sql)
+        if not status:
+            print(msg)
+        return status
+
+    def reserve_schedule_refs(self, count: int) -> int:
+        # Reserves `count` consecutive schedule references, returns the first
+        # one or -1 if the reservation fails
+        name = MSSQLData.SCHEDULE_REF_NAME
+        try:
+            with self._pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(MSSQLData.SCHEDULE_REF_RESERVE, (count, name))
+                    next_ref = cursor.fetchval()
+                    if next_ref is None:
+                        # First reservation, a client seeding the row at the
+                        # same time makes the INSERT add nothing or fail
+                        conn.commit()
+                        try:
+                            cursor.execute(MSSQLData.SCHEDULE_REF_SEED, (name, name))
+                            conn.commit()
+                        except self._backend.Error:
+                            conn.rollback()
+                        cursor.execute(MSSQLData.SCHEDULE_REF_RESERVE, (count, name))
+                        next_ref = cursor.fetchval()
+                    conn.commit()
+                except self._backend.Error:
+                    conn.rollback()
+                    raise
+                finally:
+                    cursor.close()
+        except (self._backend.Error, PoolTimeoutError) as ex:
+            sqlstate = ex.args[0]
+            print(f"Error reserving schedule references: {sqlstate}")
+            return -1
+
+        if next_ref is None:
+            return -1
+
+        return int(next_ref) - count
+
+    def fetch_comm_breaks(self, start_date: QDate, end_date: QDate, hours: list) -> dict:
+        # Fetch all commercial breaks booked in the date range and hours in a single query.
+        # Returns {(schedule_date, hour): [CommercialBreakItem]}, schedule_date as yyyy-MM-dd
+        if len(hours) == 0:
+            return {}
+
+        sql = (f"Select Schedule.ScheduleDate, Schedule.ScheduleTime, Schedule.ScheduleHour, "
+                f"Schedule.BookedSpots,   sum(Spots.SpotBookedDuration) SpotBookedDuration "
+                f"from schedule, SpotBookings, Spots  "
+                f"where Schedule.ScheduleReference = SpotBookings.SpotBookingBreakRef "
+                f"and Spots.SpotRef = SpotBookings.SpotBookingSpot "
+                f"and scheduledate BETWEEN ? AND ? "
+                f"and ScheduleHour in ({', '.join('?' * len(hours))}) "
+                f"and ItemSource = 'COMMS' "
+                f"and SpotBookingPlayStatus <> 'CANCEL' "
+                f"Group By Schedule.ScheduleDate, Schedule.ScheduleTime, Schedule.ScheduleHour, "
+                f"Schedule.BookedSpots "
+                f"order by ScheduleDate, ScheduleHour, ScheduleTime")
+
+        params = (start_date.toPyDate(), end_date.toPyDate()) + tuple(hours)
+        rows = self.execute_query(sql, params)
+
+        if rows is None:
+            return None
+
+        comm_breaks = {}
+
+        for row in rows:
+            sched_date = row[int(CommercialColumn.SCHEDULE_DATE)].strftime("%Y-%m-%d")
+            comm_item = self._make_comm_break_item(row)
+
+            key = (sched_date, comm_item.hour())
+            if key not in comm_breaks:
+                comm_breaks[key] = []
+            comm_breaks[key].append(comm_item)
+
+        return comm_breaks
+
+    def _make_comm_break_item(self, db_record) -> CommercialBreakItem:
+        break_time = db_record[int(CommercialColumn.SCHEDULE_TIME)].strftime('%H:%M:%S')
+        hour = int(db_record[int(CommercialColumn.SCHEDULE_HOUR)])
+        booked_spots = db_record[int(CommercialColumn.BOOKED_SPOTS)]
+        booked_duration = db_record[int(CommercialColumn.BOOKED_DURATION)]
+
+        title = f"{break_time} - Commercial Break ({booked_spots} spot{'' if booked_spots == 1 else 's'})"
+
+        comm_item = CommercialBreakItem(title)
+        comm_item.set_hour(hour)
+        comm_item.set_start_time(QTime.fromString(break_time, "HH:mm:ss"))
+        comm_item.set_booked_spots(booked_spots)
+        comm_item.set_booked_duration(booked_duration*1000)
+
+        return comm_item
+
     def _make_mssql_connection(self):
         server = MSSQL_CONN['server']
         database = MSSQL_CONN['database']
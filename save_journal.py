@@ -0,0 +1,117 @@
+import time
+import pickle
+import sqlite3
+
+
+# Kept next to templates.db
+SAVE_JOURNAL_DB = "save_journal.db"
+
+
+class SaveJournal:
+    """
+    Local write-ahead journal of the schedule saves. Each date of a save is
+    added to the journal as a chunk, with the statements that write it,
+    before the chunk is sent to the server. It is marked committed after its
+    server transaction, so a save that stops halfway can be resumed from its
+    first uncommitted chunk, see ScheduleUpdater. A save is `planned` once
+    all its dates are in the journal.
+
+    Chunks delete the hours they write before inserting them, running one
+    again after a crash between the server commit and the journal update
+    gives the same result.
+    """
+
+    OPEN, ABANDONED = "open", "abandoned"
+
+    # Saves are only resumed against the database they were planned for,
+    # "target" is backend|server|database.
+    CREATE_SAVE_TABLE = ("CREATE TABLE IF NOT EXISTS journal_save ("
+                         " save_id INTEGER PRIMARY KEY AUTOINCREMENT, target TEXT, schedule_ref INTEGER, "
+                         " state TEXT, planned INTEGER DEFAULT 0, failures INTEGER DEFAULT 0, created INTEGER)")
+
+    CREATE_CHUNK_TABLE = ("CREATE TABLE IF NOT EXISTS journal_chunk ("
+                          " save_id INTEGER, seq INTEGER, schedule_date TEXT, hours TEXT, row_count INTEGER, "
+                          " statements BLOB, committed INTEGER DEFAULT 0, "
+                          " PRIMARY KEY (save_id, seq))")
+
+    def __init__(self, db_name: str = SAVE_JOURNAL_DB):
+        self._database = db_name
+        self._con = sqlite3.connect(self._database)
+        # The journal must be on disk before the server is written to
+        self._con.execute("PRAGMA synchronous=FULL")
+        self._con.execute(SaveJournal.CREATE_SAVE_TABLE)
+        self._con.execute(SaveJournal.CREATE_CHUNK_TABLE)
+        self._con.commit()
+
+    def close(self):
+        self._con.close()
+
+    def begin(self, target: str, schedule_ref: int) -> int:
+        cursor = self._con.execute("INSERT INTO journal_save (target, schedule_ref, state, created) "
+                                   " VALUES (?, ?, ?, ?)",
+                                   (target, schedule_ref, SaveJournal.OPEN, int(time.time())))
+        return cursor.lastrowid
+
+    def add_chunk(self, save_id: int, seq: int, schedule_date: str, hours: list, row_count: int,
+                  statements: list):
+        # statements: [(sql, param_rows)] as given to MSSQLData.execute_many
+        self._con.execute("INSERT INTO journal_chunk (save_id, seq, schedule_date, hours, row_count, statements) "
+                          " VALUES (?, ?, ?, ?, ?, ?)",
+                          (save_id, seq, schedule_date, ",".join(map(str, hours)), row_count,
+                           pickle.dumps(statements)))
+
+    def commit_chunk(self):
+        # The chunk is on disk, it can be sent to the server
+        self._con.commit()
+
+    def mark_planned(self, save_id: int):
+        self._con.execute("UPDATE journal_save SET planned = 1 WHERE save_id = ?", (save_id,))
+        self._con.commit()
+
+    def unfinished_save(self, target: str) -> tuple:
+        # (save_id, schedule_ref, failures, planned) of the last open save to the
+        # target, None if there is none
+        row = self._con.execute("SELECT save_id, schedule_ref, failures, planned FROM journal_save "
+                                " WHERE target = ? AND state = ? ORDER BY save_id DESC LIMIT 1",
+                                (target, SaveJournal.OPEN)).fetchone()
+        return None if row is None else tuple(row)
+
+    def chunk_counts(self, save_id: int) -> tuple:
+        # (committed chunks, all chunks)
+        row = self._con.execute("SELECT COALESCE(SUM(committed), 0), COUNT(*) FROM journal_chunk "
+                                " WHERE save_id = ?", (save_id,)).fetchone()
+        return int(row[0]), int(row[1])
+
+    def pending_chunks(self, save_id: int):
+        # Yields (seq, schedule_date, hours, row_count, statements) of the uncommitted
+        # chunks in order, one chunk is loaded at a time.
+        seqs = [row[0] for row in self._con.execute("SELECT seq FROM journal_chunk "
+                                                    " WHERE save_id = ? AND committed = 0 ORDER BY seq",
+                                                    (save_id,))]
+        for seq in seqs:
+            schedule_date, hours, row_count, statements = self._con.execute(
+                "SELECT schedule_date, hours, row_count, statements FROM journal_chunk "
+                " WHERE save_id = ? AND seq = ?", (save_id, seq)).fetchone()
+
+            yield seq, schedule_date, [int(h) for h in hours.split(",")], row_count, pickle.loads(statements)
+
+    def mark_committed(self, save_id: int, seq: int):
+        self._con.execute("UPDATE journal_chunk SET committed = 1 WHERE save_id = ? AND seq = ?", (save_id, seq))
+        self._con.commit()
+
+    def record_failure(self, save_id: int) -> int:
+        # Returns the number of failed attempts of the save
+        self._con.execute("UPDATE journal_save SET failures = failures + 1 WHERE save_id = ?", (save_id,))
+        self._con.commit()
+        return self._con.execute("SELECT failures FROM journal_save WHERE save_id = ?", (save_id,)).fetchone()[0]
+
+    def finish(self, save_id: int):
+        # A finished save is of no more use, its statements are dropped
+        self._con.execute("DELETE FROM journal_chunk WHERE save_id = ?", (save_id,))
+        self._con.execute("DELETE FROM journal_save WHERE save_id = ?", (save_id,))
+        self._con.commit()
+
+    def abandon(self, save_id: int):
+        # Kept for inspection, it is not resumed again
+        self._con.execute("UPDATE journal_save SET state = ? WHERE save_id = ?", (SaveJournal.ABANDONED, save_id))
+        self._con.commit()
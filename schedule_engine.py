@@ -0,0 +1,439 @@
+import random
+from collections import OrderedDict
+
+from PyQt5.QtCore import QDate
+
+from template import Template
+
+from data_types import (
+    ItemType,
+    DBAction
+)
+
+from template_item import (
+    SongItem,
+    FolderItem
+)
+
+from hour_buffer import HourBuffer
+from start_times import assign_start_times
+
+from track_index import (
+    TrackIndex,
+    FolderTrackIndex
+)
+
+SMALL_DURATION_MS = 30000  # 30 seconds
+
+class GenerationStats:
+    """
+    Attempts needed to fill each generated hour, and the hours that ran out
+    of attempts and were trimmed. Hours that take many attempts point to
+    templates that are hard to fill from the catalog.
+    """
+    def __init__(self):
+        # (date, hour) -> attempts, date as "yyyy-MM-dd"
+        self._attempts = {}
+        self._trimmed = set()
+
+    def record(self, date_str: str, hour: int, attempts: int, trimmed: bool = False):
+        self._attempts[(date_str, hour)] = attempts
+        if trimmed:
+            self._trimmed.add((date_str, hour))
+
+    def merge(self, other: "GenerationStats"):
+        self._attempts.update(other._attempts)
+        self._trimmed.update(other._trimmed)
+
+    def attempts(self, date_str: str, hour: int) -> int:
+        return self._attempts.get((date_str, hour), 0)
+
+    def hour_count(self) -> int:
+        return len(self._attempts)
+
+    def total_attempts(self) -> int:
+        return sum(self._attempts.values())
+
+    def retried_hours(self) -> list:
+        # [(date, hour, attempts)] of hours that needed more than one attempt
+        return sorted((date_str, hour, attempts) for (date_str, hour), attempts in self._attempts.items()
+                      if attempts > 1)
+
+    def trimmed_hours(self) -> list:
+        return sorted(self._trimmed)
+
+
+# Per-process state for parallel generation, filled once by init_worker
+# so that the catalog is not sent again with every batch of dates.
+_worker_state = {}
+
+
+class ScheduleEngine:
+    """
+    Generates schedule items for a template from the track catalog and the
+    commercial breaks booked for each hour. The engine has no widgets and
+    no database access, it can be run on a worker thread or on its own.
+    """
+    # Attempts at filling an hour before the best one is trimmed to fit
+    MAX_HOUR_ATTEMPTS = 10
+
+    def __init__(self, template: Template, tracks: dict, folders: dict, logger=None, rng=None,
+                 max_attempts: int = MAX_HOUR_ATTEMPTS):
+        self._template = template
+        self._tracks = tracks
+        self._folders = folders
+        self._logger = logger
+        self._rng = rng if rng is not None else random.Random()
+        self._max_attempts = max(1, max_attempts)
+        self._stats = GenerationStats()
+
+        self._track_index = TrackIndex(tracks)
+        self._filler_track_indexes = {}
+
+    def _log_info(self, msg: str, **fields):
+        if self._logger is not None:
+            self._logger.log_info(msg, template=self._template.id(), **fields)
+
+    def _log_error(self, msg: str, **fields):
+        if self._logger is not None:
+            self._logger.log_error(msg, template=self._template.id(), **fields)
+
+    def template(self) -> Template:
+        return self._template
+
+    def stats(self) -> "GenerationStats":
+        return self._stats
+
+    def generate_day(self, sched_date: QDate, hours: list, comm_breaks: dict) -> OrderedDict:
+        # comm_breaks: {hour: [CommercialBreakItem]} for the given date
+        schedule_items = OrderedDict()
+
+        for hr in hours:
+            generated_list = self.generate_hour(sched_date, hr, comm_breaks.get(hr, []))
+
+            for item in generated_list:
+                schedule_items[item.item_identifier()] = item
+
+            self._log_info(f"Schedule generated for date: {sched_date.toString('dd-MM-yyyy')} Hour {hr}, Items generated: {len(generated_list)}",
+                           date=sched_date.toString("yyyy-MM-dd"), hour=hr)
+
+        return schedule_items
+
+    def generate_hour(self, sched_date: QDate, hour: int, comm_break_items: list) -> list:
+        date_str = sched_date.toString("yyyy-MM-dd")
+
+        self._log_info(f"Generate schedule for hour: {hour:02d}:00", date=date_str, hour=hour)
+        self._log_info(f"Total commercial breaks found for hour {hour} - {len(comm_break_items)}",
+                       date=date_str, hour=hour)
+
+        # The template slice and the breaks are the same for every attempt
+        schedule_items = [item for item in self._template.template_items().values() if item.item_type() != ItemType.EMPTY
+                            and item.db_action() != DBAction.DELETE and item.hour() == hour]
+
+        # Maintain the order of items in the template based on how they were inserted
+        schedule_items.sort(key=lambda item: item.item_row())
+
+        # Start times of the breaks are rewritten by assign_start_times, each attempt
+        # places them from their booked times again.
+        booked_times = [(comm_break, comm_break.start_time()) for comm_break in comm_break_items]
+
+        best_buffer = None
+        for attempt in range(1, self._max_attempts + 1):
+            for comm_break, start_time in booked_times:
+                comm_break.set_start_time(start_time)
+
+            hour_buffer = self._fill_hour(hour, schedule_items, comm_break_items)
+
+            if not hour_buffer.overflows():
+                self._stats.record(date_str, hour, attempt)
+                return hour_buffer.items()
+
+            self._log_error(f"Total duration for hour {hour} exceeds 1 hour: {hour_buffer.total_duration()} ms. "
+                            f"Attempt {attempt} of {self._max_attempts}", date=date_str, hour=hour, attempt=attempt)
+
+            if best_buffer is None or hour_buffer.total_duration() < best_buffer.total_duration():
+                best_buffer = hour_buffer
+
+        # Out of attempts, keep the attempt closest to the hour and drop songs from its end
+        hour_buffer = self._trim_hour(best_buffer)
+        self._stats.record(date_str, hour, self._max_attempts, trimmed=True)
+
+        self._log_error(f"Hour {hour} of {sched_date.toString('dd-MM-yyyy')} trimmed to "
+                        f"{hour_buffer.total_duration()} ms after {self._max_attempts} attempts",
+                        date=date_str, hour=hour, attempt=self._max_attempts)
+
+        return hour_buffer.items()
+
+    def _fill_hour(self, hour: int, schedule_items: list, comm_break_items: list) -> HourBuffer:
+        # One attempt at the hour: pick the tracks, add the breaks and top up with filler
+        processed_items = self._convert_category_to_track(hour, schedule_items, self._template.id())
+
+        hour_buffer = HourBuffer(hour, self._append_comm_breaks(comm_break_items, processed_items.items()))
+
+        assign_start_times(hour_buffer.items())
+
+        if hour_buffer.overflows():
+            return hour_buffer
+
+        hour_buffer = self._tight_fit_hour(hour, hour_buffer)
+
+        assign_start_times(hour_buffer.items())
+
+        return hour_buffer
+
+    def _trim_hour(self, hour_buffer: HourBuffer) -> HourBuffer:
+        # Songs are removed from the end of the hour until it fits, the
+        # header and the commercial breaks are kept.
+        while hour_buffer.overflows():
+            song_rows = [row for row, item in enumerate(hour_buffer) if item.item_type() == ItemType.SONG]
+            if len(song_rows) == 0:
+                break
+            hour_buffer.pop(song_rows[-1])
+
+        assign_start_times(hour_buffer.items())
+
+        return hour_buffer
+
+    def _pick_a_random_track(self, folder_id) -> "Track":
+        if folder_id not in self._tracks:
+            return None
+        tracks = self._tracks[folder_id]
+        if len(tracks) == 0:
+            return None
+        track_id = self._rng.choice(list(tracks.keys()))
+        track = tracks[track_id]
+        if track.duration() == 0:
+            return None
+        return track
+
+    def _pick_a_random_track_by_genre(self, item: "TemplateItem") -> "SongItem":
+        # Same folder for now
+        if item.genre() == -1:
+            return item
+
+        # Zero duration tracks are left out of the genre index
+        track = self._track_index.random_track_by_genre(item.folder_id(), item.genre(), self._rng)
+        if track is None:
+            self._log_info(f"No tracks found for genre {item.genre()} in folder {item.folder_id()}")
+            return item
+
+        song_item = self._make_song_item_from_track(track, item)
+        return song_item
+
+    def _convert_category_to_track(self, hour: int, schedule_items, template_id: int) -> HourBuffer:
+        s_items = HourBuffer(hour)
+
+        for item in schedule_items:
+
+            if item.item_type() != ItemType.FOLDER:
+                # Track - Check rotation based
+                if item.item_type() == ItemType.SONG and item.rotation() == "R":
+                    track = self._pick_a_random_track_by_genre(item)
+                    track.set_template_id(template_id)
+
+                    if not s_items.fits(track.duration()):
+                        break
+                    s_items.append(track)
+                else:
+                    if not s_items.fits(item.duration()):
+                        break
+                    s_items.append(item)
+            else:
+
+                track = self._pick_a_random_track(item.folder_id())
+
+                if track is None:
+                    self._log_info(f"No tracks found in folder {item.folder_id()}, slot skipped", hour=hour)
+                    continue
+
+                song_item = self._make_song_item_from_track(track, item)
+                song_item.set_template_id(template_id)
+
+                if not s_items.fits(song_item.duration()):
+                    break
+                s_items.append(song_item)
+
+        return s_items
+
+    def _tight_fit_hour(self, hr: int, hour_buffer: HourBuffer) -> HourBuffer:
+        # Get folder categories from the current template
+        folder_items = [item for item in self._template.template_items().values() if item.item_type() == ItemType.FOLDER]
+
+        # Pick a random folder item
+        if len(folder_items) == 0:
+            return HourBuffer(hr)
+
+        if hour_buffer.is_full():
+            return hour_buffer
+
+        last_start_time = hour_buffer[-1].start_time()
+        last_start_time = last_start_time.addMSecs(hour_buffer[-1].duration())
+
+        existing_track_ids = {item.track_id() for item in hour_buffer}
+
+        folder_search_index = 0
+
+        # If total duration is less than 3600000 ms (1 hour), we need to fill the hour
+        while not hour_buffer.is_full():
+            folder_item = self._rng.choice(folder_items)
+
+            diff_duration = hour_buffer.remaining()
+
+            if diff_duration <= SMALL_DURATION_MS and self._template.filler_folder() != -1:
+                # Look for small track in filler folder
+                track = self._find_track_within_duration_filer_folder(self._template.filler_folder(), diff_duration, existing_track_ids)
+                if track is None:
+                    break
+
+                # Find folder from folder_items with ID of filler folder
+                folder_item = FolderItem(self._folders[self._template.filler_folder()])
+                folder_item.set_folder_id(self._template.filler_folder())
+                folder_item.set_folder_name(self._folders[self._template.filler_folder()])
+                folder_item.set_hour(hr)
+            else:
+                track = self._find_track_within_duration(folder_item.folder_id(), diff_duration, existing_track_ids)
+
+            if track is None:
+                folder_search_index += 1
+                if folder_search_index >= len(folder_items):
+                    break
+                else:
+                    continue
+
+            # Check if adding this song exceeds the hour
+            if not hour_buffer.fits(track.duration()):
+                folder_search_index += 1
+                if folder_search_index >= len(folder_items):
+                    break
+                continue
+
+            song_item = self._make_song_item_from_track(track, folder_item)
+            song_item.set_start_time(last_start_time.addMSecs(track.duration()))
+
+            last_start_time = song_item.start_time()
+            # Check if song already exists in the hour
+            if song_item.track_id() in existing_track_ids:
+                continue
+
+            song_item.set_template_id(self._template.id())
+            song_item.set_hour(hr)
+            hour_buffer.append(song_item)
+
+            existing_track_ids.add(song_item.track_id())
+
+        return hour_buffer
+
+    def _find_track_within_duration_filer_folder(self, folder_id: int, max_duration: int, exclude_track_ids: set) -> "Track":
+        if folder_id not in self._tracks:
+            return None
+
+        filler_index = self._filler_folder_index(folder_id)
+        return filler_index.random_track_within_duration(max_duration, exclude_track_ids, self._rng)
+
+    def _filler_folder_index(self, folder_id: int) -> FolderTrackIndex:
+        # Within the filler folder, only tracks associated with the current template are used.
+        # If no track is linked to the template, tracks not linked to any template are used instead.
+        if folder_id not in self._filler_track_indexes:
+            filtered_tracks, tracks = self._filter_tracks_linked_to_template(self._template.id(), folder_id)
+            if len(filtered_tracks) > 0:
+                self._filler_track_indexes[folder_id] = FolderTrackIndex(filtered_tracks.values())
+            else:
+                self._filler_track_indexes[folder_id] = FolderTrackIndex(tracks.values())
+
+        return self._filler_track_indexes[folder_id]
+
+    def _find_track_within_duration(self, folder_id: int, max_duration: int, exclude_track_ids: set) -> "Track":
+        return self._track_index.random_track_within_duration(folder_id, max_duration, exclude_track_ids, self._rng)
+
+    def _filter_tracks_linked_to_template(self, template_id: int, folder_id: int) -> tuple[dict, dict]:
+        # Track is linked to template in member using field show, that contains comma separated template IDs.
+        # If the field is empty, it means the track is linked to all templates. The show fields are parsed
+        # once when the catalog is built, see TrackCatalog.template_track_ids.
+        tracks = self._tracks[folder_id]
+        linked_ids = self._tracks.template_track_ids(template_id, folder_id)
+        all_templates_ids = self._tracks.all_templates_track_ids(folder_id)
+
+        all_tracks = {}
+        filtered_tracks = {}
+        for track_id, track in tracks.items():
+            if track_id in all_templates_ids:
+                all_tracks[track_id] = track
+            elif track_id in linked_ids:
+                filtered_tracks[track_id] = track
+
+        return filtered_tracks, all_tracks
+
+    def _make_song_item_from_track(self, track: "Track", item: "TemplateItem") -> "SongItem":
+        song_item = SongItem(track.title())
+        song_item.set_artist_id(track.artist_id())
+        song_item.set_duration(track.duration())
+        song_item.set_title(track.title())
+        song_item.set_track_id(track.track_id())
+        song_item.set_artist_name(track.artist_name())
+        song_item.set_item_path(track.file_path())
+
+        song_item.set_folder_name(item.folder_name())
+        song_item.set_folder_id(item.folder_id())
+        song_item.set_hour(item.hour())
+        song_item.set_start_time(item.start_time())
+
+        return song_item
+
+    def _append_comm_breaks(self, comm_break_items: list, processed_items: list) -> list:
+        appended_list = []
+        for hour in self._template.hours():
+
+            hour_comm_breaks = [comm_break for comm_break in comm_break_items if comm_break.hour() == hour]
+
+            items = []
+            for item in processed_items:
+                if item.start_time() is None:
+                    continue
+                if item.hour() == hour and item.start_time().toString("hh:mm:ss") != "":
+                    items.append(item)
+
+            if len(items) > 0:
+                header_item = items.pop(0)
+
+                mixed_items = items + hour_comm_breaks
+
+                mixed_items.sort(key=lambda x: x.start_time())
+
+                self._clip_overflow_times(mixed_items)
+                clean_items = [item for item in mixed_items if item.start_time() != None ]
+
+                clean_items.insert(0, header_item)
+                appended_list += clean_items
+
+        return appended_list
+
+    def _clip_overflow_times(self, schedule_items: list):
+        hr = -1
+        for idx, item in enumerate(schedule_items):
+            if hr != item.hour():
+                hr = item.hour()
+            if item.start_time().hour() > hr:
+                item.set_start_time(None)
+
+
+def init_worker(template: Template, tracks: dict, folders: dict,
+                max_attempts: int = ScheduleEngine.MAX_HOUR_ATTEMPTS):
+    # ProcessPoolExecutor initializer: each worker gets its own read-only copy
+    _worker_state["template"] = template
+    _worker_state["tracks"] = tracks
+    _worker_state["folders"] = folders
+    _worker_state["max_attempts"] = max_attempts
+
+
+def generate_dates(dates: list, hours: list, comm_breaks: dict, seed: int) -> tuple:
+    # Runs in a worker process. dates are "yyyy-MM-dd" strings and comm_breaks
+    # is {date: {hour: [CommercialBreakItem]}}. Returns ([(date, items)], GenerationStats).
+    engine = ScheduleEngine(_worker_state["template"], _worker_state["tracks"],
+                            _worker_state["folders"], rng=random.Random(seed),
+                            max_attempts=_worker_state["max_attempts"])
+    results = []
+    for date_str in dates:
+        sched_date = QDate.fromString(date_str, "yyyy-MM-dd")
+        schedule_items = engine.generate_day(sched_date, hours, comm_breaks.get(date_str, {}))
+        results.append((date_str, schedule_items))
+    return results, engine.stats()
@@ -0,0 +1,227 @@
+import random
+
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    as_completed
+)
+
+from PyQt5.QtCore import (
+    QObject,
+    pyqtSignal,
+    QDate
+)
+
+from mssql_data import MSSQLData
+from logging_handlers import EventLogger
+from schedule_engine import (
+    ScheduleEngine,
+    GenerationStats,
+    init_worker,
+    generate_dates
+)
+from data_types import MSSQL_CONN
+
+
+class ScheduleGenerator(QObject):
+    """
+    Runs the schedule engine over a date range on a worker thread
+    """
+
+    generate_started = pyqtSignal()
+
+    generate_progress = pyqtSignal(int, str)
+
+    generate_completed = pyqtSignal(bool)
+
+    def __init__(self, template: "Template", tracks: dict, folders: dict,
+                 start_date: QDate, end_date: QDate, hours: list, logger: EventLogger,
+                 workers: int = 1, seed: int = None,
+                 max_attempts: int = ScheduleEngine.MAX_HOUR_ATTEMPTS, parent=None):
+        QObject.__init__(self, parent)
+        self._template = template
+        self._tracks = tracks
+        self._folders = folders
+        self._start_date = start_date
+        self._end_date = end_date
+        self._hours = hours
+        self._logger = logger
+        self._workers = workers
+        self._seed = seed
+        self._max_attempts = max_attempts
+
+        self._daily_schedule = {}
+        self._stats = GenerationStats()
+        self._comm_breaks = {}
+
+    def _log_info(self, msg: str):
+        self._logger.log_info(msg)
+
+    def _log_error(self, msg: str):
+        self._logger.log_error(msg)
+
+    def daily_schedule(self) -> dict:
+        return self._daily_schedule
+
+    def stats(self) -> GenerationStats:
+        return self._stats
+
+    def exec_(self):
+        self.generate_started.emit()
+
+        try:
+            self._generate()
+        except Exception as e:
+            msg = f"Error generating schedule: {e}"
+            self.generate_progress.emit(0, msg)
+            self._log_error(msg)
+            self.generate_completed.emit(False)
+            return
+
+        self.generate_completed.emit(True)
+
+    def _generate(self):
+        dates = self._schedule_dates()
+        if len(dates) == 0:
+            return
+
+        self._comm_breaks = self._prefetch_comm_breaks(dates)
+        if self._comm_breaks is None:
+            raise RuntimeError("Unable to fetch commercial breaks from the database.")
+
+        if self._workers > 1 and len(dates) > 1:
+            self._generate_parallel(dates)
+        else:
+            self._generate_serial(dates)
+
+        self._log_stats()
+
+    def _schedule_dates(self) -> list:
+        # Dates in the selected range that fall on the template days of week
+        dow = self._template.dow()
+        dates = []
+
+        for sched_date in self._get_dates(self._start_date, self._end_date):
+            str_date = sched_date.toString("dd-MM-yyyy")
+
+            self._log_info(f"Processing date: {str_date}")
+
+            if sched_date.dayOfWeek() not in dow:
+                self._log_info(f"Skipping date {str_date} as it is not in template day of week.")
+                continue
+
+            dates.append(sched_date)
+
+        return dates
+
+    def _generate_serial(self, dates: list):
+        # A seed gives the same schedule on every run, as in parallel mode
+        rng = None if self._seed is None else random.Random(self._seed)
+        engine = ScheduleEngine(self._template, self._tracks, self._folders, self._logger, rng=rng,
+                                max_attempts=self._max_attempts)
+
+        for count, sched_date in enumerate(dates, start=1):
+            str_date = sched_date.toString("dd-MM-yyyy")
+
+            self._log_info(f"Creating schedule for date: `{str_date}`")
+
+            comm_breaks = self._comm_breaks_for_date(sched_date)
+
+            schedule_items = engine.generate_day(sched_date, self._hours, comm_breaks)
+            self._daily_schedule[sched_date.toString("yyyy-MM-dd")] = schedule_items
+
+            percent = (count * 100) // len(dates)
+            self.generate_progress.emit(percent, f"Schedule generated for date: {str_date}")
+
+        self._stats.merge(engine.stats())
+
+    def _generate_parallel(self, dates: list):
+        # Dates are independent of each other, so the range is split into contiguous
+        # chunks, one per worker process. Each chunk gets its own seeded RNG.
+        chunks = self._split_dates(dates, self._workers)
+
+        seed = self._seed
+        if seed is None:
+            seed = random.SystemRandom().randrange(2**32)
+
+        self._log_info(f"Generating {len(dates)} date(s) using {len(chunks)} worker processes. Seed: {seed}")
+
+        generated = {}
+
+        with ProcessPoolExecutor(max_workers=len(chunks), initializer=init_worker,
+                                 initargs=(self._template, self._tracks, self._folders,
+                                           self._max_attempts)) as executor:
+            futures = []
+            for index, chunk in enumerate(chunks):
+                date_strs = [sched_date.toString("yyyy-MM-dd") for sched_date in chunk]
+                comm_breaks = {}
+                for sched_date, date_str in zip(chunk, date_strs):
+                    comm_breaks[date_str] = self._comm_breaks_for_date(sched_date)
+
+                futures.append(executor.submit(generate_dates, date_strs, self._hours, comm_breaks, seed + index))
+
+            for future in as_completed(futures):
+                results, stats = future.result()
+                self._stats.merge(stats)
+
+                for date_str, schedule_items in results:
+                    generated[date_str] = schedule_items
+                    self._log_info(f"Schedule generated for date: {date_str}, Items generated: {len(schedule_items)}")
+
+                percent = (len(generated) * 100) // len(dates)
+                self.generate_progress.emit(percent, f"Schedule generated for {len(generated)} of {len(dates)} date(s)")
+
+        # Merge back in date order
+        for date_str in sorted(generated.keys()):
+            self._daily_schedule[date_str] = generated[date_str]
+
+    def _log_stats(self):
+        self._log_info(f"Hours generated: {self._stats.hour_count()}, "
+                       f"total attempts: {self._stats.total_attempts()}")
+
+        for date_str, hour, attempts in self._stats.retried_hours():
+            self._log_info(f"Date {date_str} hour {hour} took {attempts} attempts")
+
+        for date_str, hour in self._stats.trimmed_hours():
+            self._log_error(f"Date {date_str} hour {hour} did not fit after {self._max_attempts} attempts, songs were trimmed")
+
+    def _split_dates(self, dates: list, workers: int) -> list:
+        chunk_count = min(workers, len(dates))
+        chunk_size, remainder = divmod(len(dates), chunk_count)
+        chunks = []
+        start = 0
+        for index in range(chunk_count):
+            end = start + chunk_size + (1 if index < remainder else 0)
+            chunks.append(dates[start:end])
+            start = end
+        return chunks
+
+    def _prefetch_comm_breaks(self, dates: list) -> dict:
+        # All breaks for the range are read once and kept in memory as
+        # {(schedule_date, hour): [CommercialBreakItem]}
+        self._log_info(f"Fetching commercial breaks from {dates[0].toString('dd-MM-yyyy')} to {dates[-1].toString('dd-MM-yyyy')}")
+
+        dbconn = MSSQLData(MSSQL_CONN['server'], MSSQL_CONN['database'],
+                       MSSQL_CONN['username'], MSSQL_CONN['password'])
+
+        if not dbconn.connect():
+            return None
+
+        comm_breaks = dbconn.fetch_comm_breaks(dates[0], dates[-1], self._hours)
+        dbconn.disconnect()
+
+        if comm_breaks is not None:
+            total = sum(len(breaks) for breaks in comm_breaks.values())
+            self._log_info(f"Total commercial breaks found: {total}")
+
+        return comm_breaks
+
+    def _comm_breaks_for_date(self, sched_date: QDate) -> dict:
+        date_str = sched_date.toString("yyyy-MM-dd")
+        return {hr: self._comm_breaks.get((date_str, hr), []) for hr in self._hours}
+
+    def _get_dates(self, start_date: QDate, end_date: QDate) -> list:
+        dates = []
+        while start_date <= end_date:
+            dates.append(start_date)
+            start_date = start_date.addDays(1)
+        return dates
@@ -0,0 +1,63 @@
+import threading
+
+from mssql_data import MSSQLData
+
+
+class ScheduleRefAllocator:
+    """
+    Hands out schedule references from blocks reserved in the
+    ScheduleRefBlock table. A block is reserved with a single UPDATE and kept
+    in memory, the following references cost no query until it is used up.
+    References of a block not used before the application exits are lost,
+    the references are unique but not consecutive.
+    Use ScheduleRefAllocator.for_database() to share the block of a database
+    between the saves of the process.
+    """
+
+    BLOCK_SIZE = 50
+
+    _allocators = {}
+    _allocators_lock = threading.Lock()
+
+    def __init__(self, mssql_conn: MSSQLData, block_size: int = BLOCK_SIZE):
+        self._mssql_conn = mssql_conn
+        self._block_size = max(1, block_size)
+        self._next_ref = 0
+        self._end_ref = 0
+        self._table_created = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, mssql_conn: MSSQLData, **kwargs) -> "ScheduleRefAllocator":
+        with cls._allocators_lock:
+            if mssql_conn.conn_str not in cls._allocators:
+                cls._allocators[mssql_conn.conn_str] = cls(mssql_conn, **kwargs)
+            return cls._allocators[mssql_conn.conn_str]
+
+    def next_ref(self) -> int:
+        # -1 if a new block is needed and cannot be reserved
+        with self._lock:
+            if self._next_ref >= self._end_ref and not self._reserve_block():
+                return -1
+
+            schedule_ref = self._next_ref
+            self._next_ref += 1
+            return schedule_ref
+
+    def remaining(self) -> int:
+        with self._lock:
+            return self._end_ref - self._next_ref
+
+    def _reserve_block(self) -> bool:
+        if not self._table_created:
+            self._table_created = self._mssql_conn.create_schedule_ref_table()
+            if not self._table_created:
+                return False
+
+        first_ref = self._mssql_conn.reserve_schedule_refs(self._block_size)
+        if first_ref < 0:
+            return False
+
+        self._next_ref = first_ref
+        self._end_ref = first_ref + self._block_size
+        return True
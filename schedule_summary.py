@@ -235,10 +235,15 @@ class ScheduleSummaryDialog(widget, base):
         self.logger.log_info(f"Create schedule for template: `{self.current_template.name()}`")
         self.logger.log_info(f"Create schedule date range: {dates}")
 
-        insert_stmts = self._make_insert_statements(dates, self.current_template.hours())
-        self._execute_insert_statement(insert_stmts)
+        row_count = self._promote_auto_schedule(dates, self.current_template.hours())
 
-        self.logger.log_info(f"Schedule creation completed successfully.")
+        if row_count == -1:
+            log_msg = "Error creating schedule, no rows were added."
+            self.show_message(log_msg)
+            self.logger.log_error(log_msg)
+            return False
+
+        self.logger.log_info(f"Schedule creation completed successfully. Rows added: {row_count}")
 
         return True
 
@@ -277,6 +282,7 @@ class ScheduleSummaryDialog(widget, base):
 
         delete_stmt = self._make_delete_stmt_for_scheduled_data(dates, self.current_template.hours())
         self._execute_delete_statement(delete_stmt)
+        self._delete_fingerprints(dates, self.current_template.hours())
         
         self.logger.log_info(f"Delete Scheduled data. End.")
 
@@ -323,6 +329,7 @@ class ScheduleSummaryDialog(widget, base):
 
         self.logger.log_info(f"Deleting all data for AutoSchedule table statement: {delete_stmt}")
         status, msg = self._execute_delete_statement(delete_stmt)
+        self._delete_fingerprints(dates, self.current_template.hours())
 
         # Delete from local cache
         self.schedule_items = [si for si in self.schedule_items if si.schedule_date().toString("yyyy-MM-dd") not in dates]
@@ -348,74 +355,6 @@ class ScheduleSummaryDialog(widget, base):
         return grouped_schedule
             
 
-    def _make_insert_statements(self, dates: list, hours: list) -> dict:
-        date_str = ', '.join([f"'{date}'" for date in dates])
-        hour_str = ', '.join(map(str, hours))
-
-        query = f"""
-        SELECT 1 AS ScheduleService, schedule_ref AS ScheduleLineRef,
-            schedule_date AS ScheduleDate, start_time AS ScheduleTime, 
-            schedule_hour AS ScheduleHour, item_row AS ScheduleHourTime, 
-            track_id AS ScheduleTrackReference, 0 AS ScheduleFadeIn,
-            0 AS ScheduleFadeOut, 0 AS ScheduleFadeDelay, 
-            'CUED' AS PlayStatus, 1 AS AutoTransition, 
-            1 AS LiveTransition, 'SONG' AS ItemSource, 
-            'AUDIO' AS ScheduleCommMediaType
-        FROM AutoSchedule 
-        WHERE schedule_date IN ({date_str})
-        AND schedule_hour in  ({hour_str})
-        AND duration > 0
-        ORDER BY schedule_date, schedule_hour
-        """
-        dbconn =  MSSQLData(
-            MSSQL_CONN['server'], 
-            MSSQL_CONN['database'], 
-            MSSQL_CONN['username'], 
-            MSSQL_CONN['password'])
-
-        results = dbconn.execute_query(query)
-
-        insert_stmts = {}
-
-        for result in results:
-            ScheduleService = result[0]
-            ScheduleLineRef = result[1]
-            ScheduleDate = result[2]
-            ScheduleTime = result[3]
-            ScheduleHour = result[4]
-            ScheduleHourTime = result[5]
-            ScheduleTrackReference = result[6]
-            ScheduleFadeIn = result[7]
-            ScheduleFadeOut = result[8]
-            ScheduleFadeDelay = result[9]
-            PlayStatus = result[10]
-            AutoTransition = result[11]
-            LiveTransition = result[12]
-            ItemSource = result[13]
-            ScheduleCommMediaType = result[14]
-
-            insert_stmt = f"""
-            INSERT INTO Schedule (ScheduleService, ScheduleLineRef, ScheduleDate, 
-                                  ScheduleTime, ScheduleHour, ScheduleHourTime, 
-                                  ScheduleTrackReference, ScheduledFadeIn, ScheduledFadeOut,
-                                  ScheduledFadeDelay, PlayStatus, AutoTransition, 
-                                  LiveTransition, ItemSource, ScheduleCommMediaType)
-            VALUES ({ScheduleService}, {ScheduleLineRef}, '{ScheduleDate}', '{ScheduleTime}', 
-                     {ScheduleHour}, {ScheduleHourTime}, {ScheduleTrackReference}, 
-                     {ScheduleFadeIn}, {ScheduleFadeOut}, {ScheduleFadeDelay}, 
-                     '{PlayStatus}', {AutoTransition}, {LiveTransition}, 
-                     '{ItemSource}', '{ScheduleCommMediaType}');
-            """
-
-            if ScheduleDate in insert_stmts:
-                insert_stmts[ScheduleDate].append(insert_stmt)
-            else:
-                insert_stmts[ScheduleDate] = [insert_stmt]
-
-        # conn.close()
-
-        return insert_stmts
-
     def _make_delete_stmt_for_scheduled_data(self, dates: list, hours: list) -> str:
         date_str = ', '.join([f"'{date}'" for date in dates])
         hour_str = ', '.join(map(str, hours))
@@ -471,18 +410,29 @@ class ScheduleSummaryDialog(widget, base):
             dbconn.disconnect()
             return schedule
 
-    def _execute_insert_statement(self, statements: dict):
+    def _promote_auto_schedule(self, dates: list, hours: list) -> int:
         dbconn =  MSSQLData(
             MSSQL_CONN['server'], 
             MSSQL_CONN['database'], 
             MSSQL_CONN['username'], 
             MSSQL_CONN['password'])
 
-        if dbconn.connect():
-            for date, stmts in statements.items():
-                mssql_inserts = "".join(stmts)
-                dbconn.execute_non_query(mssql_inserts)
-            dbconn.disconnect()
+        return dbconn.promote_auto_schedule(dates, hours)
+
+    def _delete_fingerprints(self, dates: list, hours: list):
+        # The next save writes these hours again, see ScheduleUpdater
+        dbconn =  MSSQLData(
+            MSSQL_CONN['server'], 
+            MSSQL_CONN['database'], 
+            MSSQL_CONN['username'], 
+            MSSQL_CONN['password'])
+
+        if not dbconn.create_schedule_fingerprint_table():
+            return
+
+        status, msg = dbconn.delete_schedule_fingerprints(dates, hours)
+        if not status:
+            self.logger.log_error(f"Error deleting schedule fingerprints: {msg}")
 
     def _execute_delete_statement(self, statement: str):
         dbconn =  MSSQLData(
@@ -1,5 +1,8 @@
-import time
-import random
+import queue
+import hashlib
+import threading
+
+import datetime
 
 from PyQt5.QtCore import (
    QObject,
@@ -11,7 +14,26 @@ from data_config import DataConfiguration
 from logging_handlers import EventLogger
 from template_item import ItemType
 from mssql_data import MSSQLData
+from schedule_refs import ScheduleRefAllocator
 from data_types import MSSQL_CONN
+from save_journal import (
+    SaveJournal,
+    SAVE_JOURNAL_DB
+)
+
+
+_STOP = object()
+
+
+class _SaveProgress:
+    # Counts of a save, updated by the thread running ScheduleUpdater.exec_
+    def __init__(self, total_dates: int, dates: int = 0):
+        self.total_dates = total_dates
+        self.dates = dates
+        self.rows = 0
+        self.hours = 0
+        self.hours_skipped = 0
+        self.failed = False
 
 
 class ScheduleUpdater(QObject):
@@ -27,18 +49,62 @@ class ScheduleUpdater(QObject):
 
     INFORMATION, WARNING, ERROR = range(0, 3)
 
-    def __init__(self, daily_schedule: dict, logger: EventLogger, parent=None):
+    # Rows sent to the server per executemany round trip
+    BATCH_SIZE = 1000
+
+    SCHEDULE_INSERT = ("Insert into schedule (ScheduleService, ScheduleLineRef, ScheduleDate, "
+                       " ScheduleTime, ScheduleHour, ScheduleHourTime, ScheduleTrackReference, "
+                       " ScheduledFadeIn, ScheduledFadeOut, ScheduledFadeDelay, PlayStatus, "
+                       " AutoTransition, LiveTransition, ItemSource, ScheduleCommMediaType )"
+                       " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+    AUTO_SCHEDULE_INSERT = ("Insert into AutoSchedule ( schedule_ref, schedule_date, template_id, start_time, "
+                            " schedule_hour, item_identifier, item_type, duration, title, artist_id, artist_name, "
+                            " folder_id, folder_name, track_id, filepath, item_row )"
+                            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+    SCHEDULE_DELETE = ("DELETE FROM Schedule "
+                       " WHERE ItemSource = 'SONG'"
+                       " AND PlayStatus <> 'PLAYED'"
+                       " AND ScheduleDate = ?"
+                       " AND ScheduleHour IN ({hours})")
+
+    AUTO_SCHEDULE_DELETE = ("DELETE FROM AutoSchedule "
+                            " WHERE schedule_date = ?"
+                            " AND schedule_hour IN ({hours})")
+
+    # Position of the hour in the parameter rows
+    SCHEDULE_ROW_HOUR = 4
+    AUTO_SCHEDULE_ROW_HOUR = 4
+
+    # Attempts to reserve a block of schedule references before the save fails
+    REF_RESERVE_ATTEMPTS = 3
+
+    # Failed attempts after which an interrupted save is given up
+    MAX_RESUME_ATTEMPTS = 3
+
+    # Threads writing dates to the server, each on its own pooled connection
+    WRITERS = 2
+
+    # Dates prepared ahead of the writers, per writer
+    QUEUE_DEPTH = 2
+
+    def __init__(self, daily_schedule: dict, logger: EventLogger, batch_size: int = BATCH_SIZE,
+                 journal_db: str = SAVE_JOURNAL_DB, writers: int = WRITERS, parent=None):
         QObject.__init__(self, parent)
         self.schedule = daily_schedule
+        self._batch_size = batch_size
+        self._journal_db = journal_db
+        self._writers = max(1, writers)
         # self.db_config = DataConfiguration("")
         self.mssql_conn = self._make_mssql_connection()
         self._logger = logger
 
-    def _log_info(self, msg: str):
-        self._logger.log_info(msg)
+    def _log_info(self, msg: str, **fields):
+        self._logger.log_info(msg, **fields)
 
-    def _log_error(self, msg: str):
-        self._logger.log_error(msg)
+    def _log_error(self, msg: str, **fields):
+        self._logger.log_error(msg, **fields)
 
     def _batch_log(self, logs: list):
         for log in logs:
@@ -47,140 +113,330 @@ class ScheduleUpdater(QObject):
     def exec_(self):
         self.update_started.emit()
 
-        mssql_stmts  = []
-        sqlite_stmts = []
-        # sqlite_stmts.append("SET QUOTED_IDENTIFIER OFF;")
-        logs = []
+        journal = SaveJournal(self._journal_db)
 
-        schedule_ref = self.get_schedule_ref()
+        try:
+            # An interrupted save to this database is finished first, the new
+            # save then only writes the hours that differ from it.
+            if not self._resume_unfinished_save(journal):
+                self.update_completed.emit(False)
+                return
 
-        msg = f"Saving schedule reference: {schedule_ref}"
-        self.update_progress.emit(0, msg)
+            schedule_ref = self.get_schedule_ref()
+            if schedule_ref < 0:
+                msg = "Schedule references could not be reserved, the schedule is not saved."
+                self.update_progress.emit(0, msg)
+                self._log_error(msg)
+                self.update_completed.emit(False)
+                return
 
-        unique_hours_per_date = self.extract_unique_hours_per_date(self.schedule)
-        
-        if not self.remove_existing_hours(unique_hours_per_date):
+            msg = f"Saving schedule reference: {schedule_ref}"
+            self.update_progress.emit(0, msg)
+
+            saved_fingerprints = self._fetch_saved_fingerprints()
+
+            save_id = journal.begin(self._journal_target(), schedule_ref)
+            progress = _SaveProgress(len(self.schedule))
+
+            self._run_pipeline(journal, save_id,
+                               self._plan_chunks(journal, save_id, schedule_ref, saved_fingerprints, progress),
+                               progress)
+
+            if not progress.failed:
+                journal.finish(save_id)
+        finally:
+            journal.close()
+
+        if progress.failed:
+            self.update_completed.emit(False)
             return
 
-        for sched_date, schedule_items in self.schedule.items():
-           mssql_seq = 0
-           sqlite_seq = 0
+        msg = (f"Final schedule saved successfully. Total rows: {progress.rows}. "
+               f"Hours saved: {progress.hours}, unchanged hours skipped: {progress.hours_skipped}")
+        self.update_progress.emit(0, msg)
+        self._log_info(msg)
+
+        self.update_completed.emit(True)
+
+    def _journal_target(self) -> str:
+        return f"{self.mssql_conn.backend().name()}|{self.mssql_conn.server()}|{self.mssql_conn.database()}"
 
+    def _plan_chunks(self, journal: SaveJournal, save_id: int, schedule_ref: int,
+                     saved_fingerprints: dict, progress: "_SaveProgress"):
+        # Producer of the pipeline. Yields (seq, date, hours, row count, statements)
+        # for each date with changed hours, once the chunk is in the journal.
+        for count, (sched_date, schedule_items) in enumerate(self.schedule.items(), start=1):
            sd = QDate.fromString(sched_date, "yyyy-MM-dd")
            sched_date_fmtd = sd.toString("dd-MM-yyyy")
 
            msg = f"Preparing schedule to save for date: {sched_date_fmtd}"
            self.update_progress.emit(0, msg)
 
-           count = 0
-           for key, item in schedule_items.items():
+           schedule_rows, auto_schedule_rows = self._make_date_rows(sd, schedule_ref, schedule_items)
+
+           fingerprints = self.hour_fingerprints(schedule_rows, auto_schedule_rows)
+           hours = sorted({item.hour() for item in schedule_items.values()})
+
+           changed_hours = [hour for hour in hours
+                            if saved_fingerprints.get((sched_date, hour)) != fingerprints.get(hour)]
+
+           progress.hours_skipped += len(hours) - len(changed_hours)
+
+           if len(changed_hours) == 0:
+               progress.dates += 1
+               msg = (f"Schedule for date {sched_date_fmtd} is unchanged, not saved "
+                      f"({progress.dates} of {progress.total_dates}).")
+               self.update_progress.emit(0, msg)
+               self._log_info(msg, date=sched_date)
+               continue
+
+           schedule_rows = self._rows_in_hours(schedule_rows, ScheduleUpdater.SCHEDULE_ROW_HOUR, changed_hours)
+           auto_schedule_rows = self._rows_in_hours(auto_schedule_rows, ScheduleUpdater.AUTO_SCHEDULE_ROW_HOUR,
+                                                    changed_hours)
+
+           statements = self._date_statements(sd.toPyDate(), changed_hours, fingerprints,
+                                              schedule_rows, auto_schedule_rows)
+           row_count = len(schedule_rows) + len(auto_schedule_rows)
+
+           journal.add_chunk(save_id, count, sched_date, changed_hours, row_count, statements)
+           journal.commit_chunk()
+
+           yield count, sched_date, changed_hours, row_count, statements
+
+        journal.mark_planned(save_id)
+
+    def _run_pipeline(self, journal: SaveJournal, save_id: int, chunks, progress: "_SaveProgress"):
+        # The chunks are produced on this thread and sent by the writer threads,
+        # each date in one transaction on its own pooled connection, so a failed
+        # date leaves nothing half saved. The queue holds at most QUEUE_DEPTH
+        # dates per writer, the rows of the other dates are not built yet.
+        pending = queue.Queue(maxsize=self._writers * ScheduleUpdater.QUEUE_DEPTH)
+        results = queue.Queue()
+        failed = threading.Event()
+
+        writers = [threading.Thread(target=self._write_chunks, args=(pending, results, failed),
+                                    name=f"schedule-writer {index}", daemon=True)
+                   for index in range(self._writers)]
+
+        for writer in writers:
+            writer.start()
+
+        try:
+            for chunk in chunks:
+                # After a failure the other dates are only added to the journal,
+                # for the next save to resume.
+                if not failed.is_set():
+                    pending.put(chunk)
+                self._collect_results(journal, save_id, results, progress)
+        finally:
+            for writer in writers:
+                pending.put(_STOP)
+            for writer in writers:
+                writer.join()
+
+        self._collect_results(journal, save_id, results, progress)
+
+    def _write_chunks(self, pending: queue.Queue, results: queue.Queue, failed: threading.Event):
+        # Writer thread. After a failure the remaining chunks are left for the
+        # next save to resume.
+        while True:
+            chunk = pending.get()
+
+            if chunk is _STOP:
+                return
 
-               count += 1
+            if failed.is_set():
+                continue
 
-               if item.item_type() == ItemType.EMPTY:
-                   continue
+            seq, sched_date, hours, row_count, statements = chunk
 
-               if item.item_type() == ItemType.COMMERCIAL_BREAK:
-                   continue
+            # Any error ends the save, the thread keeps taking chunks until
+            # _STOP so the planning thread is never blocked on the queue.
+            try:
+                status, msg = self.mssql_conn.execute_many(statements, self._batch_size)
+            except Exception as e:
+                status, msg = False, str(e)
 
-               if item.item_type() == ItemType.HEADER:
-                   sqlite_seq += 1
-                   sqlite_schedule_record = self._make_auto_schedule_record(sched_date, schedule_ref,  item, sqlite_seq)
-                   sqlite_stmts.append(sqlite_schedule_record)
-                   continue
+            if not status:
+                failed.set()
 
-               mssql_seq += 1
-               mssql_schedule_insert_stmt = self._make_mssql_insert_statement(sched_date, schedule_ref, item, mssql_seq)
-               if mssql_schedule_insert_stmt == "":
-                   continue
+            results.put((seq, sched_date, hours, row_count, status, msg))
 
-               mssql_stmts.append(mssql_schedule_insert_stmt)
+    def _collect_results(self, journal: SaveJournal, save_id: int, results: queue.Queue,
+                         progress: "_SaveProgress"):
+        # Journal and progress are updated on this thread only
+        while True:
+            try:
+                seq, sched_date, hours, row_count, status, msg = results.get_nowait()
+            except queue.Empty:
+                return
 
-               sqlite_seq += 1
-               sqlite_schedule_record = self._make_auto_schedule_record(sched_date, schedule_ref,  item, sqlite_seq)
+            sched_date_fmtd = QDate.fromString(sched_date, "yyyy-MM-dd").toString("dd-MM-yyyy")
 
-               sqlite_stmts.append(sqlite_schedule_record)
-        
-        msg = f"Creating schedule for Sedric database..."
-        self.update_progress.emit(0, msg)
+            if not status:
+                if not progress.failed:
+                    journal.record_failure(save_id)
+                progress.failed = True
 
-        msg = f"Total MSSQL statements to execute: {len(mssql_stmts)}"
-        self.update_progress.emit(0, msg)
+                msg = (f"Error saving schedule for date {sched_date_fmtd}. {msg} "
+                       f"The next save resumes the dates not saved.")
+                self.update_progress.emit(0, msg)
+                self._log_error(msg, date=sched_date)
+                continue
 
-        # Chunk statements into groups of 30 
-        chunk_size = 30
-        mssql_stmts = [mssql_stmts[i:i + chunk_size] for i in range(0, len(mssql_stmts), chunk_size)]
+            journal.mark_committed(save_id, seq)
 
-        for i, chunk in enumerate(mssql_stmts):
-            mssql_all = "".join(chunk)
-            print(f"--- Executing chunk {i+1} of {len(mssql_stmts)} ---")
-            status, msg = self.mssql_conn.execute_non_query(mssql_all)
+            progress.dates += 1
+            progress.rows += row_count
+            progress.hours += len(hours)
 
-            if not status:
-                msg = f"Error creating schedule in Sedric database. {msg}"
-                self.update_progress.emit(0, msg)
-                self._log_error(msg)
-                self.update_completed.emit(False)
-                return
-            
-            msg = f"Sedric chunk {i+1} of {len(mssql_stmts)} executed successfully."
+            msg = (f"Schedule for date {sched_date_fmtd} saved ({progress.dates} of {progress.total_dates}). "
+                   f"Hours saved: {len(hours)}, rows: {row_count}")
             self.update_progress.emit(0, msg)
+            self._log_info(msg, date=sched_date)
 
-            time.sleep(0.5)  # Sleep for half a second to avoid overwhelming the server
+    def _resume_unfinished_save(self, journal: SaveJournal) -> bool:
+        # False if the interrupted save is still failing
+        unfinished = journal.unfinished_save(self._journal_target())
 
+        if unfinished is None:
+            return True
 
-        msg = f"Creating auto-schedule..."
-        self.update_progress.emit(0, msg)
-        msg = f"Total SQLite statements to execute: {len(sqlite_stmts)}"  
-        self.update_progress.emit(0, msg)
-        
-        # Chunk statements into groups of 30 
-        auto_schedule_stmts = [sqlite_stmts[i:i + chunk_size] for i in range(0, len(sqlite_stmts), chunk_size)]
-        for i, chunk in enumerate(auto_schedule_stmts):
-            sqlite_all = "".join(chunk)
-            sqlite_all = f"SET QUOTED_IDENTIFIER OFF;\n{sqlite_all}\nSET QUOTED_IDENTIFIER ON;"
-            print(f"--- Executing chunk {i+1} of {len(auto_schedule_stmts)} ---")
-            status, msg = self.mssql_conn.execute_non_query(sqlite_all)
+        save_id, schedule_ref, failures, planned = unfinished
 
-            if not status:
-                msg = f"Error creating auto-schedule. {msg}"
-                self.update_progress.emit(0, msg)
-                self._log_error(msg)
-                self.update_completed.emit(False)
-                return
-            
-            msg = f"Auto-Schedule chunk {i+1} of {len(auto_schedule_stmts)} executed successfully."
+        if failures >= ScheduleUpdater.MAX_RESUME_ATTEMPTS:
+            journal.abandon(save_id)
+            msg = (f"Interrupted save of schedule reference {schedule_ref} failed {failures} times "
+                   f"and is abandoned, the new save writes the dates again.")
             self.update_progress.emit(0, msg)
+            self._log_error(msg)
+            return True
 
-            time.sleep(0.5)  # Sleep for half a second to avoid overwhelming the server 
+        committed, total = journal.chunk_counts(save_id)
 
-        msg = "Auto-schedule data created successfully."
+        msg = (f"Resuming interrupted save of schedule reference {schedule_ref}. "
+               f"Dates left: {total - committed} of {total}")
         self.update_progress.emit(0, msg)
+        self._log_info(msg)
+
+        if not planned:
+            # The dates after the last one in the journal are written by the new save
+            self._log_error(f"Interrupted save of schedule reference {schedule_ref} was stopped while it "
+                            f"was planned, only its first {total} dates are resumed.")
+
+        progress = _SaveProgress(total, dates=committed)
+        self._run_pipeline(journal, save_id, journal.pending_chunks(save_id), progress)
+
+        if not progress.failed:
+            journal.finish(save_id)
+
+        return not progress.failed
+
+    def _fetch_saved_fingerprints(self) -> dict:
+        # Without fingerprints every hour is saved, as if none was saved before
+        if not self.mssql_conn.create_schedule_fingerprint_table():
+            self._log_error("Schedule fingerprints are not available, all hours will be saved.")
+            return {}
+
+        fingerprints = self.mssql_conn.fetch_schedule_fingerprints(list(self.schedule.keys()))
+
+        if fingerprints is None:
+            self._log_error("Schedule fingerprints could not be read, all hours will be saved.")
+            return {}
+
+        return fingerprints
+
+    def _date_statements(self, sched_date: datetime.date, hours: list, fingerprints: dict,
+                         schedule_rows: list, auto_schedule_rows: list) -> list:
+        # (sql, param_rows) for execute_many
+        placeholders = ", ".join("?" * len(hours))
+        hour_params = [(sched_date, *hours)]
+
+        return [
+            (ScheduleUpdater.SCHEDULE_DELETE.format(hours=placeholders), hour_params),
+            (ScheduleUpdater.AUTO_SCHEDULE_DELETE.format(hours=placeholders), hour_params),
+            (MSSQLData.SCHEDULE_FINGERPRINT_DELETE.format(dates="?", hours=placeholders), hour_params),
+            (ScheduleUpdater.SCHEDULE_INSERT, schedule_rows),
+            (ScheduleUpdater.AUTO_SCHEDULE_INSERT, auto_schedule_rows),
+            (MSSQLData.SCHEDULE_FINGERPRINT_INSERT,
+             [(sched_date, hour, fingerprints[hour]) for hour in hours if hour in fingerprints])
+        ]
+
+    @staticmethod
+    def _rows_in_hours(rows: list, hour_index: int, hours: list) -> list:
+        hours = set(hours)
+        return [row for row in rows if row[hour_index] in hours]
+
+    @staticmethod
+    def hour_fingerprints(schedule_rows: list, auto_schedule_rows: list) -> dict:
+        # {hour: fingerprint} of the rows _make_date_rows built for a date. It
+        # covers what is written for the hour: the tracks, their order, start
+        # times and row numbers. The schedule reference and item identifiers
+        # change on every generation and are left out.
+        contents = {}
+
+        for row in schedule_rows:
+            # (sequence, start time, track id)
+            contents.setdefault(row[ScheduleUpdater.SCHEDULE_ROW_HOUR], []).append(
+                f"S|{row[5]}|{row[3]}|{row[6]}")
+
+        for row in auto_schedule_rows:
+            # Everything after the schedule reference and date but the item identifier
+            fields = row[2:5] + row[6:]
+            contents.setdefault(row[ScheduleUpdater.AUTO_SCHEDULE_ROW_HOUR], []).append(
+                "A|" + "|".join(map(str, fields)))
+
+        return {hour: hashlib.sha1("\n".join(lines).encode("utf-8")).hexdigest()
+                for hour, lines in contents.items()}
+
+    @staticmethod
+    def _make_date_rows(sched_date: QDate, schedule_ref: int, schedule_items: dict) -> tuple:
+        # Parameter rows of SCHEDULE_INSERT and AUTO_SCHEDULE_INSERT for a date,
+        # built without a connection
+        schedule_rows = []
+        auto_schedule_rows = []
+
+        mssql_seq = 0
+        auto_seq = 0
+
+        py_date = sched_date.toPyDate()
+
+        for key, item in schedule_items.items():
+            if item.item_type() == ItemType.EMPTY:
+                continue
 
-        msg = "Final schedule saved successfully."
-        self.update_progress.emit(0, msg)
+            if item.item_type() == ItemType.COMMERCIAL_BREAK:
+                continue
 
-        self.update_completed.emit(True)
+            if item.item_type() == ItemType.HEADER:
+                auto_seq += 1
+                auto_schedule_rows.append(ScheduleUpdater._make_auto_schedule_record(py_date, schedule_ref, item, auto_seq))
+                continue
 
-    def get_schedule_ref(self) -> int:
-        schedule_ref_found = True
-        schedule_ref = -1
+            if item.start_time() is None:
+                continue
 
-        while schedule_ref_found:
-            schedule_ref = "".join(map(str, random.choices(range(1000), k=12)))[0:9]
+            mssql_seq += 1
+            schedule_rows.append(ScheduleUpdater._make_mssql_schedule_record(py_date, schedule_ref, item, mssql_seq))
 
-            # schedule_ref_found = self.db_config.record_exists(
-            #     f"Select schedule_ref from schedule where schedule_ref = {schedule_ref};"
-            # )
+            auto_seq += 1
+            auto_schedule_rows.append(ScheduleUpdater._make_auto_schedule_record(py_date, schedule_ref, item, auto_seq))
 
-            sql_stmt = f"Select schedule_ref from AutoSchedule where schedule_ref = {schedule_ref};"
-            rows = self.mssql_conn.execute_query(sql_stmt)
-            if len(rows) == 0:
-                schedule_ref_found = False
-            else:
-                schedule_ref_found = True
+        return schedule_rows, auto_schedule_rows
+
+    def get_schedule_ref(self) -> int:
+        # From the block of references reserved by this process, the database
+        # is only queried when the block is used up. -1 if no block can be
+        # reserved, a reference not taken from the table could be in a block
+        # reserved by another client.
+        allocator = ScheduleRefAllocator.for_database(self.mssql_conn)
+
+        for attempt in range(ScheduleUpdater.REF_RESERVE_ATTEMPTS):
+            schedule_ref = allocator.next_ref()
+            if schedule_ref >= 0:
+                return schedule_ref
 
-        return int(schedule_ref)
+        return -1
 
 
     def extract_unique_hours_per_date(self, schedule: dict):
@@ -196,40 +452,6 @@ class ScheduleUpdater(QObject):
         return dates
 
 
-    def remove_existing_hours(self, hours_per_date: dict) -> bool:
-        dates = []
-        unique_hours = set()
-        for date, hours in hours_per_date.items():
-            hrs = list(hours.keys())
-
-            dates.append(date)
-            unique_hours.update(hrs)
-
-        del_stmt_mssql = self._make_delete_statement_mssql(dates, unique_hours)
-
-        del_stmt_auto_schedule = self._make_delete_auto_schedule_statement(dates, unique_hours)
-
-        # Execute statements
-        status, msg =  self.mssql_conn.execute_non_query(del_stmt_mssql)
-        if status:
-            msg = f"Deleted {len(unique_hours)} hours from dates {dates} in Sedric database"
-            self.update_progress.emit(0, msg)
-            self._log_info(msg)
-
-            #if not self.db_config.execute_query(del_stmt_sqlite):
-            status, msg =  self.mssql_conn.execute_non_query(del_stmt_auto_schedule)
-            if status:
-                msg = f"Deleted {len(unique_hours)} hours from dates {dates} in auto schdule table"
-                self.update_progress.emit(0, msg)
-                self._log_info(msg)
-            else:
-                msg = f"Error deleting {len(unique_hours)} hours from dates {dates} in local database"
-                self.update_progress.emit(0, msg)
-                self._log_error(msg)
-                return False
-
-        return True
-
     def _get_schedule_ref(self, date: str, hrs: list) -> dict:
         # Fetch data from sqlite table schedule and retun a dict of
         # {date: {hour: schedule_ref}}
@@ -255,27 +477,6 @@ class ScheduleUpdater(QObject):
         return {date: schedule_ref}
 
 
-    def _make_delete_statement_mssql(self, dates: list, hours: set) ->str:
-        date_str = ",".join(f"'{d}'" for d in dates)
-        hours_str = ",".join(str(h) for h in hours)
-
-        del_stmt = (f"DELETE from Schedule "
-                    f"WHERE ItemSource = 'SONG'"
-                    f" AND PlayStatus <> 'PLAYED'"
-                    f" AND ScheduleDate in ({date_str})"
-                    f" AND ScheduleHour in ({hours_str});")
-        return del_stmt
-
-    def _make_delete_auto_schedule_statement(self, dates: list, hours: list) ->str:
-        date_str = ",".join(f"'{d}'" for d in dates)
-        hr_str = ",".join(str(h) for h in hours)
-
-        del_stmt = (f"DELETE from AutoSchedule "
-                    f"WHERE schedule_date in ({date_str})"
-                    f" AND Schedule_hour in ({hr_str});")
-        return del_stmt
-
-
     def _make_mssql_connection(self):
         server = MSSQL_CONN['server']
         database = MSSQL_CONN['database']
@@ -283,37 +484,20 @@ class ScheduleUpdater(QObject):
         password = MSSQL_CONN['password']
         return MSSQLData(server, database, username, password)
 
-    def _make_auto_schedule_record(self, sched_date: str, schedule_ref: int, item, seq: int):
-        st = item.start_time().toString('HH:mm:ss')
-
-        ins_stmt = (f' Insert into AutoSchedule ( schedule_ref, schedule_date, template_id, start_time, '
-                    f' schedule_hour, item_identifier, item_type, duration, title, artist_id, artist_name, '
-                    f' folder_id, folder_name, track_id, filepath, item_row )'
-                    f' VALUES ({schedule_ref}, "{sched_date}", {item.template_id()}, '
-                    f' "{st}", {item.hour()}, '
-                    f' "{item.item_identifier()}", {int(item.item_type())}, {item.duration()}, '
-                    f' "{item.title()}", {item.artist_id()}, "{item.artist_name()}", '
-                    f'  {item.folder_id()}, "{item.folder_name()}", {item.track_id()}, '
-                    f' "{item.item_path()}", {seq}); ')
-
-        return ins_stmt
-
-    def _make_mssql_insert_statement(self, sched_date: str, schedule_ref: int, item, seq: int):
+    @staticmethod
+    def _make_auto_schedule_record(sched_date: datetime.date, schedule_ref: int, item, seq: int) -> tuple:
+        # Parameter row for AUTO_SCHEDULE_INSERT
+        return (schedule_ref, sched_date, item.template_id(), item.start_time().toString('HH:mm:ss'),
+                item.hour(), item.item_identifier(), int(item.item_type()), item.duration(),
+                item.title(), item.artist_id(), item.artist_name(), item.folder_id(),
+                item.folder_name(), item.track_id(), item.item_path(), seq)
+
+    @staticmethod
+    def _make_mssql_schedule_record(sched_date: datetime.date, schedule_ref: int, item, seq: int) -> tuple:
+        # Parameter row for SCHEDULE_INSERT
         status = ''
         item_source = 'SONG'
         comm_audio = 'AUDIO'
 
-        start_time = item.start_time()
-        if start_time is None:
-            return ""
-
-        ins_stmt = (f" Insert into schedule (ScheduleService, ScheduleLineRef, ScheduleDate, "
-                    f" ScheduleTime, ScheduleHour, ScheduleHourTime, ScheduleTrackReference, "
-                    f" ScheduledFadeIn, ScheduledFadeOut, ScheduledFadeDelay, PlayStatus, "
-                    f" AutoTransition, LiveTransition, ItemSource, ScheduleCommMediaType )"
-                    f" VALUES ({1}, {schedule_ref}, CONVERT(DATETIME, '{sched_date}', 102), "
-                    f" '{start_time.toString('HH:mm:ss')}', {item.hour()}, "
-                    f" {seq}, {item.track_id()}, {0}, {0}, {0}, '{status}', {1}, {1}, '{item_source}', '{comm_audio}');"
-                    )
-
-        return ins_stmt
+        return (1, schedule_ref, sched_date, item.start_time().toString('HH:mm:ss'), item.hour(),
+                seq, item.track_id(), 0, 0, 0, status, 1, 1, item_source, comm_audio)
@@ -0,0 +1,33 @@
+from PyQt5.QtCore import QTime
+
+from hour_buffer import ONE_HOUR_MS
+
+ONE_DAY_MS = 24 * ONE_HOUR_MS
+
+
+def start_offsets(items) -> list:
+    # Start of each item in ms from the top of its hour, in one pass. Every
+    # hour has its own running total, items of an hour follow each other.
+    running = {}
+    offsets = []
+    for item in items:
+        hour = item.hour()
+        offset = running.get(hour, 0)
+        offsets.append(offset)
+        running[hour] = offset + item.duration()
+    return offsets
+
+
+def offset_to_time(hour: int, offset: int) -> QTime:
+    # Wraps past midnight like QTime.addMSecs
+    return QTime.fromMSecsSinceStartOfDay((hour * ONE_HOUR_MS + offset) % ONE_DAY_MS)
+
+
+def assign_start_times(items: list, clip: bool = False):
+    # Sets the start time of each item. With clip, items starting after the
+    # end of their hour get None, they do not fit in the hour.
+    for item, offset in zip(items, start_offsets(items)):
+        if clip and offset >= ONE_HOUR_MS:
+            item.set_start_time(None)
+        else:
+            item.set_start_time(offset_to_time(item.hour(), offset))
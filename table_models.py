@@ -0,0 +1,220 @@
+from PyQt5.QtCore import (
+    Qt,
+    QTime,
+    QAbstractTableModel,
+    QSortFilterProxyModel,
+    QModelIndex,
+    QVariant
+)
+
+from PyQt5.QtGui import (
+    QColor,
+    QBrush
+)
+
+from data_types import ItemType
+
+
+# Same colours as the table widget items in template_item
+ITEM_BACKGROUNDS = {
+    ItemType.HEADER: QBrush(QColor(189,189,189)),
+    ItemType.FOLDER: QBrush(QColor(253,230,224)),
+    ItemType.FIRST_COLUMN: QBrush(QColor(245,245,245)),
+    ItemType.COMMERCIAL_BREAK: QBrush(QColor(234, 234, 116))
+}
+
+
+def _format_start_time(item) -> str:
+    start_time = item.start_time()
+    if isinstance(start_time, QTime):
+        return start_time.toString("hh:mm:ss")
+    return "" if start_time is None else str(start_time)
+
+
+def _format_track_id(item) -> str:
+    return "" if item.track_id() == 0 else item.formatted_track_id()
+
+
+def _format_date(item) -> str:
+    return "" if item.item_type() == ItemType.HEADER else item.formatted_date()
+
+
+def _format_header_start_time(item) -> str:
+    return "" if item.item_type() == ItemType.HEADER else _format_start_time(item)
+
+
+class ScheduleTableModel(QAbstractTableModel):
+    """
+    Schedule items as table rows. The model keeps a reference to the items
+    and formats a cell only when the view asks for it, so only the visible
+    rows are formatted.
+    """
+
+    # (header, formatter) of each column
+    SCHEDULE_COLUMNS = [
+        ("Start", _format_start_time),
+        ("Length", lambda item: item.formatted_duration()),
+        ("Title", lambda item: item.title()),
+        ("Artist", lambda item: item.artist_name()),
+        ("Category", lambda item: item.folder_name()),
+        ("Filename", _format_track_id),
+        ("Path", lambda item: item.item_path())
+    ]
+
+    VIEW_SCHEDULE_COLUMNS = [
+        ("Date", _format_date),
+        ("Start", _format_header_start_time)
+    ] + SCHEDULE_COLUMNS[1:]
+
+    def __init__(self, columns: list = SCHEDULE_COLUMNS, parent=None):
+        QAbstractTableModel.__init__(self, parent)
+        self._columns = columns
+        self._items = []
+
+    def set_items(self, items: list):
+        self.beginResetModel()
+        self._items = items
+        self.endResetModel()
+
+    def clear(self):
+        self.set_items([])
+
+    def item(self, row: int) -> "TemplateItem":
+        return self._items[row]
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._items)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._columns)
+
+    def headerData(self, section: int, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self._columns[section][0]
+        return QVariant()
+
+    def flags(self, index: QModelIndex):
+        # Hour headers are not selectable, like HeaderTableWidgetItem
+        if self._items[index.row()].item_type() == ItemType.HEADER:
+            return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+
+        item = self._items[index.row()]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._columns[index.column()][1](item)
+
+        if role == Qt.ItemDataRole.UserRole:
+            return item.item_identifier()
+
+        if role == Qt.ItemDataRole.BackgroundRole:
+            return ITEM_BACKGROUNDS.get(item.item_type(), QVariant())
+
+        if role == Qt.ItemDataRole.TextAlignmentRole and item.item_type() == ItemType.HEADER:
+            return Qt.AlignmentFlag.AlignCenter
+
+        return QVariant()
+
+
+class ScheduleFilterProxyModel(QSortFilterProxyModel):
+    """
+    Shows the rows of a ScheduleTableModel in the selected hours and dates.
+    None means no filter. Dates are in dd/MM/yyyy format.
+    """
+    def __init__(self, parent=None):
+        QSortFilterProxyModel.__init__(self, parent)
+        self._hours = None
+        self._dates = None
+
+    def set_hours(self, hours):
+        self._hours = None if hours is None else set(hours)
+        self.invalidateFilter()
+
+    def set_dates(self, dates):
+        self._dates = None if dates is None else set(dates)
+        self.invalidateFilter()
+
+    def item(self, row: int) -> "TemplateItem":
+        return self.sourceModel().item(self.mapToSource(self.index(row, 0)).row())
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        item = self.sourceModel().item(source_row)
+
+        if self._hours is not None and item.hour() not in self._hours:
+            return False
+
+        if self._dates is not None and item.formatted_date() not in self._dates:
+            return False
+
+        return True
+
+
+class TrackTableModel(QAbstractTableModel):
+    """
+    Tracks of a folder, or of a search, as table rows. Reads from the
+    {track_id: Track} mapping it is given, a folder of the TrackCatalog
+    is not copied.
+    """
+
+    COLUMNS = [
+        ("Title", lambda track: track.title()),
+        ("Artist", lambda track: track.artist_name()),
+        ("Duration", lambda track: str(track.formatted_duration())),
+        ("Track ID", lambda track: track.formatted_track_id()),
+        ("FilePath", lambda track: track.file_path())
+    ]
+
+    def __init__(self, parent=None):
+        QAbstractTableModel.__init__(self, parent)
+        self._tracks = {}
+        self._track_ids = []
+
+    def set_tracks(self, tracks):
+        self.beginResetModel()
+        self._tracks = tracks
+        self._track_ids = list(tracks)
+        self.endResetModel()
+
+    def clear(self):
+        self.set_tracks({})
+
+    def track_id(self, row: int) -> int:
+        return self._track_ids[row]
+
+    def track(self, row: int) -> "Track":
+        return self._tracks[self._track_ids[row]]
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._track_ids)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(TrackTableModel.COLUMNS)
+
+    def headerData(self, section: int, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return TrackTableModel.COLUMNS[section][0]
+        return QVariant()
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return TrackTableModel.COLUMNS[index.column()][1](self.track(index.row()))
+
+        if role == Qt.ItemDataRole.UserRole:
+            return self._track_ids[index.row()]
+
+        return QVariant()
@@ -10,6 +10,7 @@ from PyQt5.QtWidgets import (
    QTableWidgetItem,
    QHeaderView,
    QTreeWidgetItem,
+   QTreeWidgetItemIterator,
    QAbstractScrollArea,
    QMessageBox,
 )
@@ -19,6 +20,7 @@ from PyQt5.QtCore import (
     QSize,
     QTime,
     QObject,
+    QThread,
     QItemSelectionModel
 )
 
@@ -59,8 +61,19 @@ from data_types import (
 )
 
 from track import Track
+from track_catalog import TrackCatalog
+from track_snapshot import (
+    TrackSnapshot,
+    TrackSnapshotRefresher,
+    delta_folder_ids
+)
 
 from template_stats import TemplateStatistics
+from table_models import TrackTableModel
+from start_times import (
+    start_offsets,
+    offset_to_time
+)
 
 
 widget, base = uic.loadUiType('template_config.ui')
@@ -154,15 +167,32 @@ class TemplateConfiguration(widget, base):
         self.spStats.setSizes([800, 200])
 
         self.twMedia.itemClicked.connect(self.on_media_item_clicked)
-        self.twTracks.itemClicked.connect(self.on_track_clicked)
+
+        self.track_model = TrackTableModel(self)
+        self.tvTracks.setModel(self.track_model)
+        self.tvTracks.clicked.connect(self.on_track_clicked)
 
         self.twItems.itemDoubleClicked.connect(self.on_item_double_clicked)
 
-        self.tracks = self.load_tracks()
+        # Open with the local snapshot of the catalog and bring it up to date
+        # from the server in the background. The first run has no snapshot,
+        # so the catalog is read from the server and saved.
+        self.track_snapshot = TrackSnapshot()
+        self.refresh_thread = None
+        self.track_refresher = None
+
+        self.tracks = self.track_snapshot.load()
+        snapshot_loaded = len(self.tracks) > 0
+
+        if not snapshot_loaded:
+            self.tracks = self.load_tracks()
 
         self.tracks_avg = {}
         self.create_media_folders()
 
+        if snapshot_loaded:
+            self.refresh_tracks()
+
         self.twTemplates.itemSelectionChanged.connect(self.on_template_selected)
 
         self.itf = ItemTableKeyFilter(self)
@@ -280,9 +310,8 @@ class TemplateConfiguration(widget, base):
                 
 
     def compute_start_times(self):
-        current_hour = -1
-        total_hour_duration = 0
-        total_hour_time = QTime(0, 0, 0)
+        rows = []
+        items = []
 
         for row in range(self.twItems.rowCount()):
 
@@ -291,24 +320,26 @@ class TemplateConfiguration(widget, base):
                 continue
 
             item_identifier = column1.data(Qt.ItemDataRole.UserRole)
-            #item_id = self.twItems.item(row, 0).data(Qt.ItemDataRole.UserRole)
-
-            #item_id = column1.data(Qt.ItemDataRole.UserRole)
             item = self.current_template.item(item_identifier)
 
             if item.item_type() == ItemType.EMPTY:
                 continue
 
-            if item.item_type() == ItemType.HEADER:
-                prev_hr = item.hour()
-                prev_start_time = QTime(prev_hr, 0, 0)
-                prev_dur = item.duration()
-                item.set_item_row(row)
-                item.set_start_time(prev_start_time)
+            rows.append(row)
+            items.append(item)
 
+        offsets = start_offsets(items)
+
+        current_hour = -1
+        header_total = 0
+
+        for row, item, offset in zip(rows, items, offsets):
+            item.set_start_time(offset_to_time(item.hour(), offset))
+            item.set_item_row(row)
+
+            if item.item_type() == ItemType.HEADER:
                 current_hour = item.hour()
-                total_hour_duration = 0
-                total_hour_time = QTime(item.hour(), 0, 0)
+                header_total = 0
                 continue
 
             # If item has no ID (id = -1), mark it for creation, else update
@@ -317,18 +348,11 @@ class TemplateConfiguration(widget, base):
             else:
                 item.set_db_action(DBAction.UPDATE) 
 
-            start_time = prev_start_time.addMSecs(prev_dur)
-            item.set_start_time(start_time)
-            item.set_item_row(row)
-            
             self.twItems.item(row, 0).setText(item.formatted_start_time())
 
-            prev_start_time = start_time
-            prev_dur = item.duration()
-
-            total_hour_duration += item.duration()
-            total_hour_time = total_hour_time.addMSecs(item.duration())
-            self._hour_headers[current_hour].setText(total_hour_time.toString("HH:mm:ss"))
+            # Hour header shows the time the hour is filled to
+            header_total += item.duration()
+            self._hour_headers[current_hour].setText(offset_to_time(current_hour, header_total).toString("HH:mm:ss"))
 
 
     def set_template_table(self):
@@ -648,15 +672,16 @@ class TemplateConfiguration(widget, base):
         self.show_tracks(node_id)
 
     def prepare_tracks_table(self):
-       self.twTracks.clear()
-       self.twTracks.setRowCount(0)
-       self.twTracks.setColumnCount(5)
-       self.twTracks.setColumnWidth(0, 450)
-       self.twTracks.setColumnWidth(1, 450)
-       self.twTracks.setColumnWidth(2, 160)
-       self.twTracks.setColumnWidth(3, 160)
-       self.twTracks.setColumnWidth(4, 300)
-       self.twTracks.setHorizontalHeaderLabels(["Title", "Artist", "Duration", "Track ID", "FilePath"])
+       self.track_model.clear()
+
+       # Fixed row heights, the view does not measure rows it does not show
+       self.tvTracks.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+
+       self.tvTracks.setColumnWidth(0, 450)
+       self.tvTracks.setColumnWidth(1, 450)
+       self.tvTracks.setColumnWidth(2, 160)
+       self.tvTracks.setColumnWidth(3, 160)
+       self.tvTracks.setColumnWidth(4, 300)
 
     def show_tracks(self, folder_id: int):
        self.prepare_tracks_table()
@@ -670,22 +695,14 @@ class TemplateConfiguration(widget, base):
        self.display_tracks(tracks)
 
     def display_tracks(self, tracks: dict):
-       for track_ref, track in tracks.items():
-           row = self.twTracks.rowCount()
-           self.twTracks.insertRow(row)
-           track_title_twi = QTableWidgetItem(track.title())
-           track_title_twi.setData(Qt.ItemDataRole.UserRole, track.track_id())
-           self.twTracks.setItem(row, 0, track_title_twi)
-           self.twTracks.setItem(row, 1, QTableWidgetItem(track.artist_name()))
-           self.twTracks.setItem(row, 2, QTableWidgetItem(str(track.formatted_duration())))
-           self.twTracks.setItem(row, 3, QTableWidgetItem(track.formatted_track_id()))
-           self.twTracks.setItem(row, 4, QTableWidgetItem(track.file_path()))
+       # The model reads the tracks from the mapping, rows are formatted when shown
+       self.track_model.set_tracks(tracks)
 
     def on_track_clicked(self):
-        selected = self.twTracks.selectedItems()
+        selected = self.tvTracks.selectionModel().selectedRows()
         if len(selected) > 0:
             self.item_clicked = "track"
-            track_id = selected[0].data(Qt.ItemDataRole.UserRole)
+            track_id = self.track_model.track_id(selected[0].row())
             self.current_folder = self.get_current_folder_by_track_id(track_id)
             if self.current_folder is None:
                 return
@@ -858,41 +875,71 @@ class TemplateConfiguration(widget, base):
         return MSSQLData(server, database, username, password)
 
     def load_tracks(self) -> dict:
-        tracks = {}
+        # Full sync from the server into the snapshot
+        refresher = TrackSnapshotRefresher(self.track_snapshot, full_resync=True)
+        if not refresher.sync():
+            return TrackCatalog()
 
-        mssql = self._get_mssql_connection()
+        print(f"Tracks loaded from server. Rows pulled: {refresher.rows_pulled()}")
 
-        if mssql.connect():
-            sql = (f"SELECT TrackReference, TrackTitle, ArtistSearch, "
-                   f" Duration, ArtistID_1, FolderID, FilePath, Genre, TrackPrimeNote "
-                   f" FROM Tracks "
-                   f" WHERE ArtistID_1 is not Null"
-                     f" AND FolderID > 0 "
-                     f" AND TrackDeleted = 0 "
-                   f" ORDER BY Folderid, TrackReference ")
+        return refresher.catalog()
 
-            rows = mssql.execute_query(sql)
-            for row in rows:
-                track_reference = int(row[int(TrackColumns.TRACK_REFERENCE)])
-                track = Track(track_reference)
-                track.set_title(row[TrackColumns.TRACK_TITLE])
-                track.set_artist_name(row[TrackColumns.ARTIST_SEARCH])
-                track.set_duration(int(row[TrackColumns.DURATION]))
+    def refresh_tracks(self):
+        if self.refresh_thread is not None:
+            return
 
-                track.set_artist_id(int(row[TrackColumns.ARTISTID_1]))
+        self.track_refresher = TrackSnapshotRefresher(self.track_snapshot)
+        self.refresh_thread = QThread(self)
 
-                folder_id = int(row[TrackColumns.FOLDER_ID])
-                track.set_folder_id(folder_id)
-                track.set_file_path(row[TrackColumns.FILEPATH])
-                track.set_genre(row[TrackColumns.GENRE])
-                track.set_show(row[TrackColumns.SHOW])
+        self.track_refresher.moveToThread(self.refresh_thread)
+        self.refresh_thread.started.connect(self.track_refresher.exec_)
+        self.track_refresher.refresh_completed.connect(self.on_tracks_refreshed)
+        self.refresh_thread.finished.connect(self.refresh_thread.deleteLater)
+
+        self.refresh_thread.start()
+
+    def on_tracks_refreshed(self, status: bool):
+        self.refresh_thread.quit()
+        self.refresh_thread.wait()
+        self.refresh_thread = None
 
-                if folder_id not in tracks:
-                    tracks[folder_id] = {}
+        if not status:
+            print("Unable to refresh tracks from the server, using local snapshot.")
+            return
+
+        upserts, deletes = self.track_refresher.delta()
+        catalog = self.track_refresher.catalog()
+
+        sync_mode = "incremental" if self.track_refresher.sync_mode() == TrackSnapshotRefresher.INCREMENTAL_SYNC else "full"
+        print(f"Tracks refreshed ({sync_mode} sync). Rows pulled: {self.track_refresher.rows_pulled()}, "
+              f"Changed: {len(upserts)}, Removed: {len(deletes)}")
 
-                tracks[folder_id][track_reference] = track
+        self.track_refresher = None
+
+        if len(upserts) == 0 and len(deletes) == 0:
+            return
 
-        return tracks
+        # Open schedule dialogs keep the catalog they were given
+        self.tracks = catalog
+        changed_folders = delta_folder_ids(upserts, deletes)
+
+        self.update_folder_track_counts(changed_folders)
+
+        if self.item_clicked == "folder" and self.current_folder is not None:
+            if self.current_folder['id'] in changed_folders:
+                self.show_tracks(self.current_folder['id'])
+
+    def update_folder_track_counts(self, folder_ids: set):
+        it = QTreeWidgetItemIterator(self.twMedia)
+        while it.value():
+            item = it.value()
+            node_id = item.data(0, Qt.ItemDataRole.UserRole)
+            if node_id in folder_ids:
+                name = item.text(0).split('(')[0].strip()
+                node_name = f"{name} ({self.track_count(node_id)})"
+                item.setText(0, node_name)
+                self.folder_names[node_id] = node_name
+            it += 1
 
     def track_count(self, folder_id:int) -> int:
         if folder_id not in self.tracks:
@@ -1,7 +1,4 @@
 import os
-import hashlib
-import string
-import random
 
 from PyQt5.QtWidgets import (
     QTableWidgetItem
@@ -26,10 +23,19 @@ from data_types import (
 )
 
 class TemplateItem():
+    # Thousands of items are made while generating a schedule, slots keep
+    # them small and cheap to create. Subclasses declare their own slots.
+    __slots__ = ("_id", "_item_type", "_start_time", "_formatted_time", "_hour", "_duration",
+                 "_title", "_artist_id", "_artist_name", "_folder_name", "_folder_id", "_item_path",
+                 "_track_id", "_item_row", "_item_title", "_time_stamp", "_db_action",
+                 "_schedule_db_action", "_item_identifier", "_template_id", "_schedule_ref",
+                 "_schedule_date", "_rotation", "_genre")
+
     def __init__(self, item_title: str=""):
+        # _start_time and _schedule_date are created on first use and the
+        # identifier when it is first asked for, see the getters below.
         self._id = -1
         self._item_type = ItemType.EMPTY
-        self._start_time = QTime()
         self._formatted_time = ""
         self._hour = -1
         self._duration = 0
@@ -42,27 +48,28 @@ class TemplateItem():
         self._track_id = 0
         self._item_row = -1
         self._item_title = item_title
-        self._time_stamp = self.generate_time_stamp()    
+        self._time_stamp = None
         self._db_action = DBAction.NONE
         self._schedule_db_action = DBAction.CREATE
-        self._item_identifier = ""
+        self._item_identifier = None
         self._template_id = -1
         self._schedule_ref = -1
-        self._schedule_date = QDate(0,0,0)
         self._rotation = "N"
         self._genre = -1
 
-        self.make_item_identifier()
-
 
     def set_start_time(self, time:QTime):
         self._start_time = time
 
     def start_time(self) -> str:
-        return self._start_time
+        try:
+            return self._start_time
+        except AttributeError:
+            self._start_time = QTime()
+            return self._start_time
 
     def formatted_start_time(self) ->str:
-        return self._start_time.toString("HH:mm:ss")
+        return self.start_time().toString("HH:mm:ss")
         
     def set_formatted_start_time(self, stime:QTime):
         self._formatted_time = stime
@@ -145,9 +152,13 @@ class TemplateItem():
         return self._item_path
 
     def time_stamp(self):
+        if self._time_stamp is None:
+            self._time_stamp = self.generate_time_stamp()
         return self._time_stamp
 
     def item_identifier(self) -> str:
+        if self._item_identifier is None:
+            self.make_item_identifier()
         return self._item_identifier
 
     def set_item_identifier(self, identifier: str):
@@ -187,7 +198,11 @@ class TemplateItem():
         self._schedule_ref = ref
 
     def schedule_date(self) -> QDate:
-        return self._schedule_date
+        try:
+            return self._schedule_date
+        except AttributeError:
+            self._schedule_date = QDate(0,0,0)
+            return self._schedule_date
 
     def set_schedule_date(self, date: QDate):
         self._schedule_date = date
@@ -205,17 +220,15 @@ class TemplateItem():
         return self._genre
 
     def formatted_date(self) -> str:
-        return self._schedule_date.toString("dd/MM/yyyy")
+        return self.schedule_date().toString("dd/MM/yyyy")
 
     def formatted_track_id(self) ->str:
         return(f"{self._track_id:08d}")
 
     def generate_time_stamp(self) -> str:
-        rand_letters = "".join(random.choices(string.ascii_letters, k=15))
-        rand_ints = "".join(map(str, random.choices(range(100), k=18)))
-        rand_bytes = os.urandom(15)
-        hash_id = hashlib.sha256(rand_letters.encode()+rand_bytes+rand_ints.encode()).hexdigest()
-        return hash_id[0:20]
+        # 80 random bits from the OS as 20 hex digits, same length as before.
+        # Unique across the generation worker processes, unlike a counter.
+        return os.urandom(10).hex()
 
     def format_audio_len(self, audio_len: int) ->str:
         seconds = audio_len // 1000
@@ -229,6 +242,8 @@ class TemplateItem():
         
 
 class HeaderItem(TemplateItem):
+    __slots__ = ()
+
     def __init__(self, item_title: str=""):
         super(HeaderItem, self).__init__(item_title)
         self._title = "HEADER"
@@ -245,6 +260,8 @@ class HeaderItem(TemplateItem):
         return self._title
 
 class BlankItem(TemplateItem):
+    __slots__ = ()
+
     def __init__(self, item_title: str="", hour: int=-1):
         super(BlankItem, self).__init__(item_title)
         self._title = ""
@@ -267,6 +284,8 @@ class BlankItem(TemplateItem):
 
 
 class FolderItem(TemplateItem):
+    __slots__ = ()
+
     def __init__(self, item_title:str=""):
         super(FolderItem, self).__init__(item_title)
         self._item_type = ItemType.FOLDER
@@ -293,6 +312,8 @@ class FolderItem(TemplateItem):
 
 
 class SongItem(TemplateItem):
+    __slots__ = ()
+
     def __init__(self, item_title:str=""):
         super(SongItem, self).__init__(item_title)
         self._item_type = ItemType.SONG
@@ -322,6 +343,8 @@ class SongItem(TemplateItem):
 
 
 class CommercialBreakItem(TemplateItem):
+    __slots__ = ("_booked_spots", "_booked_duration")
+
     def __init__(self, item_title:str=""):
         super(CommercialBreakItem, self).__init__(item_title)
         self._item_type = ItemType.COMMERCIAL_BREAK
@@ -353,6 +376,8 @@ class CommercialBreakItem(TemplateItem):
 
 
 class ScheduleItem(TemplateItem):
+    __slots__ = ()
+
     def __init__(self, item_title:str=""):
         super(ScheduleItem, self).__init__(item_title)
         self._item_type = ItemType.SCHEDULE_ITEM
@@ -1,3 +1,6 @@
+from data_types import TrackColumns
+
+
 
 class Track:
     def __init__(self, track_id: int):
@@ -76,4 +79,19 @@ class Track:
         seconds %= 60
     
         # Format as "HH:MM:SS"
-        return f"{hours:02}:{minutes:02}:{seconds:02}"
\ No newline at end of file
+        return f"{hours:02}:{minutes:02}:{seconds:02}"
+
+
+def make_track(db_record) -> Track:
+    # db_record columns are in TrackColumns order
+    track = Track(int(db_record[int(TrackColumns.TRACK_REFERENCE)]))
+    track.set_title(db_record[TrackColumns.TRACK_TITLE])
+    track.set_artist_name(db_record[TrackColumns.ARTIST_SEARCH])
+    track.set_duration(int(db_record[TrackColumns.DURATION]))
+    track.set_artist_id(int(db_record[TrackColumns.ARTISTID_1]))
+    track.set_folder_id(int(db_record[TrackColumns.FOLDER_ID]))
+    track.set_file_path(db_record[TrackColumns.FILEPATH])
+    genre = db_record[TrackColumns.GENRE]
+    track.set_genre(-1 if genre is None else int(genre))
+    track.set_show(db_record[TrackColumns.SHOW])
+    return track
@@ -0,0 +1,310 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+from data_types import TrackColumns
+
+
+class StringTable:
+    """
+    Each distinct string is stored once, columns keep its index
+    """
+    def __init__(self):
+        self._values = []
+        self._index = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add_all(self, values) -> array:
+        # Adds the strings not seen yet, returns the index of each value
+        lookup = self._index
+        table = self._values
+        indexes = array('i')
+        for value in values:
+            index = lookup.get(value)
+            if index is None:
+                index = lookup[value] = len(table)
+                table.append(value)
+            indexes.append(index)
+        return indexes
+
+    def value(self, index: int) -> str:
+        return self._values[index]
+
+    def freeze(self):
+        # The lookup dict is only needed while the catalog is being built
+        self._index = None
+
+
+class TrackView:
+    """
+    Read only Track over one row of a TrackCatalog. Has the same getters as
+    Track, so it can be used wherever a Track is read.
+    """
+    __slots__ = ("_catalog", "_row")
+
+    def __init__(self, catalog: "TrackCatalog", row: int):
+        self._catalog = catalog
+        self._row = row
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, TrackView) and self._catalog is other._catalog and self._row == other._row
+
+    def __hash__(self) -> int:
+        return hash((id(self._catalog), self._row))
+
+    def row(self) -> int:
+        return self._row
+
+    def track_id(self) -> int:
+        return self._catalog._track_ids[self._row]
+
+    def title(self) -> str:
+        return self._catalog._strings.value(self._catalog._titles[self._row])
+
+    def artist_name(self) -> str:
+        return self._catalog._strings.value(self._catalog._artist_names[self._row])
+
+    def duration(self) -> int:
+        return self._catalog._durations[self._row]
+
+    def artist_id(self) -> int:
+        return self._catalog._artist_ids[self._row]
+
+    def folder_id(self) -> int:
+        return self._catalog._folder_ids[self._row]
+
+    def file_path(self) -> str:
+        return self._catalog._strings.value(self._catalog._file_paths[self._row])
+
+    def genre(self) -> int:
+        return self._catalog._genres[self._row]
+
+    def show(self) -> str:
+        return self._catalog._strings.value(self._catalog._shows[self._row])
+
+    def formatted_track_id(self) ->str:
+        return(f"{self.track_id():08d}")
+
+    def formatted_duration(self) ->str:
+        seconds = self.duration() // 1000
+        hours = seconds // 3600
+        seconds %= 3600
+        minutes = seconds // 60
+        seconds %= 60
+
+        # Format as "HH:MM:SS"
+        return f"{hours:02}:{minutes:02}:{seconds:02}"
+
+
+class FolderTracks(Mapping):
+    """
+    {track_id: TrackView} for the rows of one folder
+    """
+    def __init__(self, catalog: "TrackCatalog", start: int, end: int):
+        self._catalog = catalog
+        self._start = start
+        self._end = end
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __iter__(self):
+        return iter(self._catalog._track_ids[self._start:self._end])
+
+    def __getitem__(self, track_id: int) -> TrackView:
+        # Rows within a folder are sorted by track id
+        row = bisect_left(self._catalog._track_ids, track_id, self._start, self._end)
+        if row == self._end or self._catalog._track_ids[row] != track_id:
+            raise KeyError(track_id)
+        return TrackView(self._catalog, row)
+
+    def rows(self) -> range:
+        return range(self._start, self._end)
+
+    def values(self) -> list:
+        return [TrackView(self._catalog, row) for row in range(self._start, self._end)]
+
+    def items(self) -> list:
+        return [(self._catalog._track_ids[row], TrackView(self._catalog, row)) for row in range(self._start, self._end)]
+
+
+class TrackCatalog(Mapping):
+    """
+    Column store of the track catalog. Numeric fields are kept in arrays and
+    string fields as indexes into a shared StringTable. Rows are sorted by
+    folder then track id, so each folder is a contiguous row range.
+
+    Reads like the {folder_id: {track_id: Track}} dict it replaces, with
+    TrackView objects in place of Track. The catalog is not changed after it
+    is built, use with_delta() to get an updated copy.
+    """
+    def __init__(self):
+        self._track_ids = array('q')
+        self._durations = array('i')
+        self._artist_ids = array('i')
+        self._folder_ids = array('i')
+        self._genres = array('i')
+
+        self._strings = StringTable()
+        self._titles = array('i')
+        self._artist_names = array('i')
+        self._file_paths = array('i')
+        self._shows = array('i')
+
+        # folder_id -> (first row, last row + 1)
+        self._folder_ranges = {}
+
+        # Track ids in ascending order and their rows, for lookups by id alone
+        self._sorted_ids = array('q')
+        self._sorted_id_rows = array('i')
+
+        # From the show field (TrackPrimeNote): template_id -> the show strings
+        # (StringTable indexes) that link a track to it, and the empty show
+        # strings, which link a track to all templates. Kept per distinct
+        # string rather than per track, most tracks share a few show values.
+        self._template_shows = {}
+        self._all_templates_shows = frozenset()
+
+    @classmethod
+    def from_rows(cls, rows) -> "TrackCatalog":
+        # rows are sequences in TrackColumns order
+        catalog = cls()
+
+        sorted_rows = sorted(rows, key=lambda row: (int(row[TrackColumns.FOLDER_ID]),
+                                                    int(row[TrackColumns.TRACK_REFERENCE])))
+        if len(sorted_rows) > 0:
+            catalog._set_columns(list(zip(*sorted_rows)))
+
+        catalog._build_indexes()
+        return catalog
+
+    @classmethod
+    def from_tracks(cls, tracks) -> "TrackCatalog":
+        # tracks is an iterable of Track (or TrackView)
+        return cls.from_rows(track_row(track) for track in tracks)
+
+    def _set_columns(self, columns: list):
+        self._track_ids = array('q', map(int, columns[TrackColumns.TRACK_REFERENCE]))
+        self._durations = array('i', map(int, columns[TrackColumns.DURATION]))
+        self._artist_ids = array('i', map(int, columns[TrackColumns.ARTISTID_1]))
+        self._folder_ids = array('i', map(int, columns[TrackColumns.FOLDER_ID]))
+        self._genres = array('i', (-1 if genre is None else int(genre) for genre in columns[TrackColumns.GENRE]))
+
+        self._titles = self._strings.add_all(columns[TrackColumns.TRACK_TITLE])
+        self._artist_names = self._strings.add_all(columns[TrackColumns.ARTIST_SEARCH])
+        self._file_paths = self._strings.add_all(columns[TrackColumns.FILEPATH])
+        self._shows = self._strings.add_all(columns[TrackColumns.SHOW])
+
+    def _build_indexes(self):
+        self._strings.freeze()
+
+        start = 0
+        for row in range(1, len(self._folder_ids) + 1):
+            if row == len(self._folder_ids) or self._folder_ids[row] != self._folder_ids[start]:
+                self._folder_ranges[self._folder_ids[start]] = (start, row)
+                start = row
+
+        order = sorted(range(len(self._track_ids)), key=self._track_ids.__getitem__)
+        self._sorted_ids = array('q', (self._track_ids[row] for row in order))
+        self._sorted_id_rows = array('i', order)
+
+        self._build_show_index()
+
+    def _build_show_index(self):
+        # Shows are interned, so each distinct show string is parsed once
+        linked = {}
+        all_templates = []
+
+        for show in set(self._shows):
+            template_ids = parse_show_field(self._strings.value(show))
+            if template_ids is None:
+                all_templates.append(show)
+                continue
+
+            for template_id in template_ids:
+                if template_id not in linked:
+                    linked[template_id] = []
+                linked[template_id].append(show)
+
+        self._template_shows = {template_id: frozenset(shows) for template_id, shows in linked.items()}
+        self._all_templates_shows = frozenset(all_templates)
+
+    def __len__(self) -> int:
+        return len(self._folder_ranges)
+
+    def __iter__(self):
+        return iter(self._folder_ranges)
+
+    def __getitem__(self, folder_id: int) -> FolderTracks:
+        start, end = self._folder_ranges[folder_id]
+        return FolderTracks(self, start, end)
+
+    def track_count(self) -> int:
+        return len(self._track_ids)
+
+    def folder_range(self, folder_id: int) -> tuple:
+        return self._folder_ranges.get(folder_id, (0, 0))
+
+    def durations(self) -> array:
+        return self._durations
+
+    def genres(self) -> array:
+        return self._genres
+
+    def template_track_ids(self, template_id: int, folder_id: int) -> frozenset:
+        # Tracks in the folder linked to the template through their show field
+        return self._track_ids_with_show(self._template_shows.get(template_id, frozenset()), folder_id)
+
+    def all_templates_track_ids(self, folder_id: int) -> frozenset:
+        # Tracks in the folder with an empty show field
+        return self._track_ids_with_show(self._all_templates_shows, folder_id)
+
+    def _track_ids_with_show(self, shows: frozenset, folder_id: int) -> frozenset:
+        if len(shows) == 0:
+            return frozenset()
+        start, end = self.folder_range(folder_id)
+        return frozenset(self._track_ids[row] for row in range(start, end) if self._shows[row] in shows)
+
+    def track(self, track_id: int) -> TrackView:
+        index = bisect_left(self._sorted_ids, track_id)
+        if index == len(self._sorted_ids) or self._sorted_ids[index] != track_id:
+            return None
+        return TrackView(self, self._sorted_id_rows[index])
+
+    def view(self, row: int) -> TrackView:
+        return TrackView(self, row)
+
+    def with_delta(self, upserts: list, deletes: list) -> "TrackCatalog":
+        # New catalog with `upserts` added or replaced and the
+        # (folder_id, track_id) in `deletes` removed
+        replaced = {track.track_id() for track in upserts}
+        replaced.update(track_id for folder_id, track_id in deletes)
+
+        rows = [track_row(TrackView(self, row)) for row in range(len(self._track_ids))
+                if self._track_ids[row] not in replaced]
+        rows.extend(track_row(track) for track in upserts)
+
+        return TrackCatalog.from_rows(rows)
+
+
+def track_row(track) -> tuple:
+    # Track fields in TrackColumns order
+    return (track.track_id(), track.title(), track.artist_name(), track.duration(),
+            track.artist_id(), track.folder_id(), track.file_path(), track.genre(), track.show())
+
+
+def parse_show_field(show: str) -> tuple:
+    # The show field holds comma separated template ids. Returns None when it
+    # is empty, meaning the track is linked to all templates. Entries that are
+    # not numbers are skipped.
+    if show is None or show == "":
+        return None
+
+    template_ids = []
+    for tid in show.split(","):
+        tid = tid.strip()
+        if tid.isdigit():
+            template_ids.append(int(tid))
+    return tuple(template_ids)
@@ -0,0 +1,108 @@
+import random
+
+from bisect import bisect_right
+
+
+class FolderTrackIndex:
+    # Number of random picks tried before falling back to a scan of the
+    # remaining candidates. Exclusion sets are small compared to a folder
+    # so the first pick is nearly always accepted.
+    MAX_REJECTIONS = 16
+
+    def __init__(self, tracks):
+        self._tracks = sorted(tracks, key=lambda track: track.duration())
+        self._durations = [track.duration() for track in self._tracks]
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def count_within_duration(self, max_duration: int) -> int:
+        return bisect_right(self._durations, max_duration)
+
+    def random_track_within_duration(self, max_duration: int, exclude_track_ids=frozenset(),
+                                     rng=random) -> "Track":
+        # Tracks are sorted by duration, so every track in [0, upper) fits.
+        upper = bisect_right(self._durations, max_duration)
+        if upper == 0:
+            return None
+
+        for _ in range(FolderTrackIndex.MAX_REJECTIONS):
+            track = self._tracks[rng.randrange(upper)]
+            if track.track_id() not in exclude_track_ids:
+                return track
+
+        # Most of the fitting tracks are excluded, pick from what is left
+        candidates = [track for track in self._tracks[:upper] if track.track_id() not in exclude_track_ids]
+        if len(candidates) == 0:
+            return None
+
+        return rng.choice(candidates)
+
+
+class TrackIndex:
+    """
+    Per-folder duration index over the {folder_id: {track_id: Track}} dict
+    returned by TemplateConfiguration.load_tracks. Folder indexes are built
+    the first time a folder is queried and reused afterwards.
+    """
+    def __init__(self, tracks: dict):
+        self._tracks = tracks
+        self._folders = {}
+
+        # (folder_id, genre) -> tuple of ids of tracks with a duration,
+        # filled for a whole folder the first time one of its genres is asked for
+        self._genre_track_ids = {}
+        self._genre_folders = set()
+
+    def folder(self, folder_id: int) -> FolderTrackIndex:
+        if folder_id not in self._tracks:
+            return None
+
+        if folder_id not in self._folders:
+            self._folders[folder_id] = FolderTrackIndex(self._tracks[folder_id].values())
+
+        return self._folders[folder_id]
+
+    def random_track_within_duration(self, folder_id: int, max_duration: int, exclude_track_ids=frozenset(),
+                                     rng=random) -> "Track":
+        folder_index = self.folder(folder_id)
+        if folder_index is None:
+            return None
+        return folder_index.random_track_within_duration(max_duration, exclude_track_ids, rng)
+
+    def genre_track_ids(self, folder_id: int, genre: int) -> tuple:
+        if folder_id not in self._genre_folders:
+            self._index_folder_genres(folder_id)
+        return self._genre_track_ids.get((folder_id, genre), ())
+
+    def random_track_by_genre(self, folder_id: int, genre: int, rng=random) -> "Track":
+        track_ids = self.genre_track_ids(folder_id, genre)
+        if len(track_ids) == 0:
+            return None
+        return self._tracks[folder_id][rng.choice(track_ids)]
+
+    def _index_folder_genres(self, folder_id: int):
+        by_genre = {}
+        for track_id, track in self._tracks.get(folder_id, {}).items():
+            if track.duration() == 0:
+                continue
+            if track.genre() not in by_genre:
+                by_genre[track.genre()] = []
+            by_genre[track.genre()].append(track_id)
+
+        for genre, track_ids in by_genre.items():
+            self._genre_track_ids[(folder_id, genre)] = tuple(track_ids)
+
+        self._genre_folders.add(folder_id)
+
+    def invalidate(self, folder_id: int = None):
+        # Drop cached folder indexes after the underlying tracks have changed
+        if folder_id is None:
+            self._folders.clear()
+            self._genre_track_ids.clear()
+            self._genre_folders.clear()
+        else:
+            self._folders.pop(folder_id, None)
+            for key in [key for key in self._genre_track_ids if key[0] == folder_id]:
+                del self._genre_track_ids[key]
+            self._genre_folders.discard(folder_id)
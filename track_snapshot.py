@@ -0,0 +1,310 @@
+import os
+import time
+import sqlite3
+
+from PyQt5.QtCore import (
+    QObject,
+    pyqtSignal
+)
+
+from track_catalog import (
+    TrackCatalog,
+    track_row
+)
+
+from mssql_data import MSSQLData
+from data_types import (
+    MSSQL_CONN,
+    TrackColumns
+)
+
+
+# Kept next to templates.db
+SNAPSHOT_DB = "track_catalog.db"
+
+
+class TrackSnapshot:
+    """
+    Local SQLite copy of the server Tracks table. Loading it is a single
+    bulk read, so the designer can open without waiting for the server.
+    """
+
+    # Columns are in TrackColumns order so rows can be passed to TrackCatalog.from_rows
+    CREATE_TABLE = ("CREATE TABLE IF NOT EXISTS tracks ("
+                    " track_id INTEGER PRIMARY KEY, title TEXT, artist_name TEXT, duration INTEGER, "
+                    " artist_id INTEGER, folder_id INTEGER, file_path TEXT, genre INTEGER, show TEXT)")
+
+    # High-water marks of the last sync, see TrackSnapshotRefresher
+    CREATE_SYNC_TABLE = "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value)"
+
+    def __init__(self, db_name: str = SNAPSHOT_DB):
+        self._database = db_name
+
+    def _connect(self):
+        con = sqlite3.connect(self._database)
+        con.execute(TrackSnapshot.CREATE_TABLE)
+        con.execute(TrackSnapshot.CREATE_SYNC_TABLE)
+        return con
+
+    def _save_sync_state(self, con, state: dict):
+        con.executemany("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", list(state.items()))
+
+    def exists(self) -> bool:
+        return os.path.exists(self._database)
+
+    def load(self) -> TrackCatalog:
+        # Empty catalog if there is no snapshot yet
+        if not self.exists():
+            return TrackCatalog()
+
+        con = self._connect()
+        try:
+            rows = con.execute("SELECT track_id, title, artist_name, duration, artist_id, "
+                               " folder_id, file_path, genre, show "
+                               " FROM tracks").fetchall()
+        except sqlite3.Error as e:
+            print(f"Error reading track snapshot: {e}")
+            return TrackCatalog()
+        finally:
+            con.close()
+
+        return TrackCatalog.from_rows(rows)
+
+    def sync_state(self) -> dict:
+        if not self.exists():
+            return {}
+
+        con = self._connect()
+        try:
+            return dict(con.execute("SELECT key, value FROM sync_state").fetchall())
+        except sqlite3.Error as e:
+            print(f"Error reading track sync state: {e}")
+            return {}
+        finally:
+            con.close()
+
+    def save(self, tracks: dict, state: dict = None) -> bool:
+        # Replace the whole snapshot
+        rows = [track_row(track) for folder in tracks.values() for track in folder.values()]
+
+        con = self._connect()
+        try:
+            with con:
+                con.execute("DELETE FROM tracks")
+                con.executemany("INSERT INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                if state is not None:
+                    self._save_sync_state(con, state)
+        except sqlite3.Error as e:
+            print(f"Error saving track snapshot: {e}")
+            return False
+        finally:
+            con.close()
+
+        return True
+
+    def apply_delta(self, upserts: list, deletes: list, state: dict = None) -> bool:
+        # The tracks and the sync state are updated in one transaction, so the
+        # marks never get ahead of the rows they describe.
+        con = self._connect()
+        try:
+            with con:
+                con.executemany("DELETE FROM tracks WHERE track_id = ?",
+                                [(track_id,) for folder_id, track_id in deletes])
+                con.executemany("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                [track_row(track) for track in upserts])
+                if state is not None:
+                    self._save_sync_state(con, state)
+        except sqlite3.Error as e:
+            print(f"Error updating track snapshot: {e}")
+            return False
+        finally:
+            con.close()
+
+        return True
+
+
+class TrackSnapshotRefresher(QObject):
+    """
+    Brings the local snapshot up to date with the server on a worker thread
+    and builds the updated catalog for the caller to swap in.
+
+    An incremental sync only pulls the rows that changed since the marks
+    saved by the previous sync. With a rowversion column on Tracks that is
+    every inserted, updated or soft-deleted row. Without one, new tracks are
+    found by TrackReference and removed tracks from the list of active ids,
+    updates are picked up by the periodic full resync.
+    """
+
+    FULL_SYNC, INCREMENTAL_SYNC = range(0, 2)
+
+    # Seconds between full resyncs, these also catch hard deletes
+    FULL_RESYNC_INTERVAL = 7 * 24 * 3600
+
+    refresh_completed = pyqtSignal(bool)
+
+    def __init__(self, snapshot: TrackSnapshot, full_resync: bool = False, parent=None):
+        QObject.__init__(self, parent)
+        self._snapshot = snapshot
+        self._full_resync = full_resync
+        self._upserts = []
+        self._deletes = []
+        self._rows_pulled = 0
+        self._sync_mode = TrackSnapshotRefresher.FULL_SYNC
+        self._catalog = None
+
+    def delta(self) -> tuple:
+        return self._upserts, self._deletes
+
+    def catalog(self) -> TrackCatalog:
+        return self._catalog
+
+    def rows_pulled(self) -> int:
+        return self._rows_pulled
+
+    def sync_mode(self) -> int:
+        return self._sync_mode
+
+    def exec_(self):
+        self.refresh_completed.emit(self.sync())
+
+    def sync(self) -> bool:
+        mssql = MSSQLData(MSSQL_CONN['server'], MSSQL_CONN['database'],
+                          MSSQL_CONN['username'], MSSQL_CONN['password'])
+
+        rowversion_column = mssql.tracks_rowversion_column()
+
+        # Marks are read before the rows, so anything that changes while the
+        # rows are fetched is pulled again by the next sync.
+        marks = mssql.fetch_track_marks(rowversion_column)
+        if marks is None:
+            return False
+
+        max_track_ref, max_rowversion = marks
+
+        state = self._snapshot.sync_state()
+
+        # Compare against the snapshot on disk, not the catalog in use by the
+        # GUI thread, which may be read while this runs.
+        old_tracks = self._snapshot.load()
+
+        delta = None
+        if self._can_sync_incrementally(state, rowversion_column):
+            delta = self._incremental_sync(mssql, state, old_tracks)
+
+        if delta is None:
+            delta = self._full_sync(mssql, old_tracks)
+            if delta is None:
+                return False
+            state['last_full_sync'] = int(time.time())
+
+        self._upserts, self._deletes = delta
+
+        state['max_track_ref'] = max_track_ref
+        state['rowversion_column'] = rowversion_column
+        state['rowversion'] = max_rowversion
+        state['rows_pulled'] = self._rows_pulled
+
+        if not self._snapshot.apply_delta(self._upserts, self._deletes, state):
+            return False
+
+        if len(self._upserts) > 0 or len(self._deletes) > 0:
+            self._catalog = old_tracks.with_delta(self._upserts, self._deletes)
+        else:
+            self._catalog = old_tracks
+
+        return True
+
+    def _can_sync_incrementally(self, state: dict, rowversion_column: str) -> bool:
+        if self._full_resync or 'last_full_sync' not in state:
+            return False
+
+        if time.time() - state['last_full_sync'] > TrackSnapshotRefresher.FULL_RESYNC_INTERVAL:
+            return False
+
+        # The table changed since the last sync, marks are no longer comparable
+        if state.get('rowversion_column') != rowversion_column:
+            return False
+
+        return True
+
+    def _full_sync(self, mssql: MSSQLData, old_tracks: dict) -> tuple:
+        self._sync_mode = TrackSnapshotRefresher.FULL_SYNC
+
+        server_tracks = mssql.fetch_tracks()
+        if server_tracks is None:
+            return None
+
+        self._rows_pulled = server_tracks.track_count()
+
+        return diff_tracks(old_tracks, server_tracks)
+
+    def _incremental_sync(self, mssql: MSSQLData, state: dict, old_tracks: dict) -> tuple:
+        self._sync_mode = TrackSnapshotRefresher.INCREMENTAL_SYNC
+
+        if state['rowversion_column'] is not None and state.get('rowversion') is not None:
+            changes = mssql.fetch_track_changes(state['rowversion_column'], state['rowversion'])
+            if changes is None:
+                return None
+
+            changed, removed_ids = changes
+            self._rows_pulled = len(changed) + len(removed_ids)
+        else:
+            changed = mssql.fetch_tracks_after(state.get('max_track_ref', 0))
+            if changed is None:
+                return None
+
+            active_ids = mssql.fetch_track_ids()
+            if active_ids is None:
+                return None
+
+            removed_ids = [track_id for folder in old_tracks.values() for track_id in folder
+                           if track_id not in active_ids]
+            self._rows_pulled = len(changed) + len(active_ids)
+
+        return merge_track_changes(old_tracks, changed, removed_ids)
+
+
+def diff_tracks(old_tracks: dict, new_tracks: dict) -> tuple:
+    # Returns (upserts, deletes): tracks added or changed in new_tracks, and
+    # (folder_id, track_id) of tracks removed from, or moved out of, a folder.
+    changed = [track for folder in new_tracks.values() for track in folder.values()]
+    new_ids = {track.track_id() for track in changed}
+    removed_ids = [track_id for folder in old_tracks.values() for track_id in folder if track_id not in new_ids]
+
+    return merge_track_changes(old_tracks, changed, removed_ids)
+
+
+def merge_track_changes(old_tracks: dict, changed: list, removed_ids: list) -> tuple:
+    # Delta between old_tracks and a list of changed tracks and removed track ids
+    old_values = {}
+    for folder in old_tracks.values():
+        for track_id, track in folder.items():
+            old_values[track_id] = track_row(track)
+
+    upserts = []
+    deletes = []
+
+    for track in changed:
+        values = track_row(track)
+        old = old_values.get(track.track_id())
+
+        if old == values:
+            continue
+
+        if old is not None and old[TrackColumns.FOLDER_ID] != track.folder_id():
+            deletes.append((old[TrackColumns.FOLDER_ID], track.track_id()))
+
+        upserts.append(track)
+
+    for track_id in removed_ids:
+        if track_id in old_values:
+            deletes.append((old_values[track_id][TrackColumns.FOLDER_ID], track_id))
+
+    return upserts, deletes
+
+
+def delta_folder_ids(upserts: list, deletes: list) -> set:
+    # Folders changed by a delta from diff_tracks or merge_track_changes
+    folder_ids = {track.folder_id() for track in upserts}
+    folder_ids.update(folder_id for folder_id, track_id in deletes)
+    return folder_ids
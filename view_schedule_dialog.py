@@ -4,7 +4,7 @@ import shutil
 from PyQt5 import uic
 
 from PyQt5.QtWidgets import (
-    QTableWidget,
+    QHeaderView,
     QListWidgetItem,
     QFileDialog,
     QDialog
@@ -20,14 +20,14 @@ from PyQt5.QtCore import (
 from data_config import DataConfiguration
 from schedule_summary import ScheduleSummaryDialog
 
-from template_item import (
-    BaseTableWidgetItem,
-    ItemType
+from table_models import (
+    ScheduleTableModel,
+    ScheduleFilterProxyModel
 )
 
 from logging_handlers import (
     EventLogger,
-    FileHandler
+    QueuedFileHandler
 )
 
 from mssql_data import MSSQLData
@@ -49,6 +49,12 @@ class ViewScheduleDialog(widget, base):
         self.schedule_items = []
         self.templates = {}
 
+        # Rows are filtered by the dates checked in lwDates
+        self.schedule_model = ScheduleTableModel(ScheduleTableModel.VIEW_SCHEDULE_COLUMNS, parent=self)
+        self.schedule_proxy = ScheduleFilterProxyModel(self)
+        self.schedule_proxy.setSourceModel(self.schedule_model)
+        self.tvViewSchedule.setModel(self.schedule_proxy)
+
         self.edtFrom.dateChanged.connect(self.on_date_changed)
         self.edtTo.dateChanged.connect(self.on_date_changed)
 
@@ -85,8 +91,13 @@ class ViewScheduleDialog(widget, base):
         log_file = f"view_schedule_{dtime}.log"
         if not os.path.exists('logs'):
             os.makedirs('logs')
-        FileHandler.set_filepath(f"logs/{log_file}")
-        return EventLogger(handler=FileHandler)
+        QueuedFileHandler.set_filepath(f"logs/{log_file}")
+        return EventLogger(handler=QueuedFileHandler)
+
+    def closeEvent(self, event):
+        # The log file of the dialog is not written to again
+        self._logger.close()
+        event.accept()
 
     def _log_info(self, msg: str):
         self._logger.log_info(msg)
@@ -230,8 +241,7 @@ class ViewScheduleDialog(widget, base):
 
 
     def _load_schedule_by_date(self, date):
-        for item in self.schedule_items:
-            self._add_schedule_item(item)
+        self.schedule_model.set_items(self.schedule_items)
 
     def _load_schedule_by_template_and_date_range(self, template: 'Template', start_date: QDate, end_date: QDate):
         self.schedule_items = self.mssql_conn.fetch_schedule_by_template_and_date_range(template.id(), start_date, end_date)
@@ -241,81 +251,42 @@ class ViewScheduleDialog(widget, base):
 
         dow = template.dow()
 
+        items = []
         dates = []
         for item in self.schedule_items:
             if item.schedule_date().dayOfWeek() not in dow:
                 continue
-            added_item = self._add_schedule_item(item)
-
-            if added_item:
-                if added_item.formatted_date() not in dates:
-                    dates.append(added_item.formatted_date())
+            items.append(item)
 
-        self._show_dates(dates)
-
-    def _add_schedule_item(self, s_item):
-        row = self.twViewSchedule.rowCount()
-        self.twViewSchedule.insertRow(row)
-
-        if s_item.item_type() not in BaseTableWidgetItem.widget_register:
-            return
+            if item.formatted_date() not in dates:
+                dates.append(item.formatted_date())
 
-        WidgetItem = BaseTableWidgetItem.widget_register[s_item.item_type()]
+        self.schedule_model.set_items(items)
 
-        if s_item.item_type() == ItemType.HEADER:
-            twiDate = WidgetItem("")
-            twiTime = WidgetItem("")
-        else:
-            twiDate = WidgetItem(s_item.formatted_date())
-            twiDate.setData(Qt.ItemDataRole.UserRole, s_item.item_identifier())
-            twiTime = WidgetItem(s_item.start_time())
-
-        self.twViewSchedule.setItem(row, 0, twiDate)
-        self.twViewSchedule.setItem(row, 1, twiTime)
-        self.twViewSchedule.setItem(row, 2, WidgetItem((s_item.formatted_duration())))
-        self.twViewSchedule.setItem(row, 3, WidgetItem(s_item.title()))
-        self.twViewSchedule.setItem(row, 4, WidgetItem(s_item.artist_name()))
-        self.twViewSchedule.setItem(row, 5, WidgetItem(s_item.folder_name()))
+        self._show_dates(dates)
 
-        if (s_item.track_id() == 0):
-            self.twViewSchedule.setItem(row, 6, WidgetItem(""))
-        else:
-            self.twViewSchedule.setItem(row, 6, WidgetItem(((s_item.formatted_track_id()))))
 
-        self.twViewSchedule.setItem(row, 7, WidgetItem(s_item.item_path()))
+    def _initilize_schedule_table(self):
+        self.schedule_model.clear()
+        self.schedule_proxy.set_dates(None)
 
-        return s_item
+        # Fixed row heights, the view does not measure rows it does not show
+        self.tvViewSchedule.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
 
-
-    def _initilize_schedule_table(self):
-        self.twViewSchedule.clear()
-        self.twViewSchedule.setRowCount(0)
-        self.twViewSchedule.setColumnCount(8)
-        self.twViewSchedule.setSizeAdjustPolicy(
-            QTableWidget.AdjustToContents
-        )
-        
-        self.twViewSchedule.setColumnWidth(0, 150)
-        self.twViewSchedule.setColumnWidth(1, 100)
-        self.twViewSchedule.setColumnWidth(2, 100)
-        self.twViewSchedule.setColumnWidth(3, 400)
-        self.twViewSchedule.setColumnWidth(4, 400)
-        self.twViewSchedule.setColumnWidth(5, 300)
-        self.twViewSchedule.setColumnWidth(6, 200)
-        self.twViewSchedule.setColumnWidth(7, 250)
-
-        self.twViewSchedule.setHorizontalHeaderLabels(["Date", "Start", "Length", "Title", "Artist", "Category", "Filename", "Path" ])
+        self.tvViewSchedule.setColumnWidth(0, 150)
+        self.tvViewSchedule.setColumnWidth(1, 100)
+        self.tvViewSchedule.setColumnWidth(2, 100)
+        self.tvViewSchedule.setColumnWidth(3, 400)
+        self.tvViewSchedule.setColumnWidth(4, 400)
+        self.tvViewSchedule.setColumnWidth(5, 300)
+        self.tvViewSchedule.setColumnWidth(6, 200)
+        self.tvViewSchedule.setColumnWidth(7, 250)
 
     def on_date_list_selected(self):
         selected_dates = self._get_selected_dates_as_string()
         self.filter_schedule_items(selected_dates)
 
     def filter_schedule_items(self, selected_dates: list):
-        for row in range(self.twViewSchedule.rowCount()):
-            item_date = self.twViewSchedule.item(row, 0).text()
-            if item_date not in selected_dates:
-                self.twViewSchedule.hideRow(row)
-            else:
-                self.twViewSchedule.showRow(row)
+        self.schedule_proxy.set_dates(selected_dates)
 
 